@@ -1,5 +1,6 @@
 import asyncio
 import logging
+from typing import Optional
 
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
@@ -7,11 +8,42 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.fsm.storage.memory import MemoryStorage
 
 from bot import db
-from bot.config import BOT_TOKEN
-from bot.handlers import admin, moderation, user
+from bot.config import BOT_TOKEN, SHUTDOWN_GRACE_SECONDS, UPDATES_RECORD_PATH
+from bot.handlers import admin, background, moderation, user
+from bot.middlewares import (
+    RecordingMiddleware,
+    flood_control,
+    global_concurrency_limit,
+    router_concurrency_limit,
+)
+from bot.services import broadcaster, leader, startup
+from bot.services.delivery import start_delivery_worker
+from bot.services.loop_monitor import start_loop_monitor
+from bot.services.retention import start_retention_worker
 from bot.services.scheduler import start_scheduled_deletion_worker
 
 
+def build_dispatcher(recorder: Optional[RecordingMiddleware] = None) -> Dispatcher:
+    """Dispatcher with every router and middleware; shared with bot.replay."""
+    dp = Dispatcher(storage=MemoryStorage())
+
+    # Record traffic as it arrives, before anything can drop it
+    if recorder:
+        dp.update.outer_middleware(recorder)
+    # Drop floods before they reach handlers and the database
+    dp.update.outer_middleware(flood_control)
+    # Cap concurrently handled updates; the rest queue or get shed
+    dp.update.outer_middleware(global_concurrency_limit())
+
+    # Include routers, each with its own concurrency cap around matched handlers
+    for module in (user, admin, moderation):
+        limit = router_concurrency_limit(module.router.name)
+        module.router.message.middleware(limit)
+        module.router.callback_query.middleware(limit)
+        dp.include_router(module.router)
+    return dp
+
+
 async def main() -> None:
     logging.basicConfig(
         level=logging.INFO,
@@ -23,21 +55,43 @@ async def main() -> None:
         return
 
     bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    dp = Dispatcher(storage=MemoryStorage())
+    recorder = RecordingMiddleware(UPDATES_RECORD_PATH) if UPDATES_RECORD_PATH else None
+    dp = build_dispatcher(recorder)
+    if recorder:
+        logging.info("Recording incoming updates to %s", UPDATES_RECORD_PATH)
+
+    # Watch for blocking calls stalling the event loop
+    start_loop_monitor()
 
-    # Include routers
-    dp.include_router(user.router)
-    dp.include_router(admin.router)
-    dp.include_router(moderation.router)
+    # Init database; caches warm up in the background while polling starts
+    await startup.prepare()
 
-    # Init database
-    await db.init_db()
+    # Start retry queue for failed sends
+    start_delivery_worker(bot)
+
+    # Only the leader instance runs the shared background workers below
+    await leader.start_leader_election()
 
     # Start scheduled deletion worker
     start_scheduled_deletion_worker(bot)
 
+    # Start retention worker
+    start_retention_worker()
+
     # Start polling
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        # Let acknowledged work (broadcasts, submissions) finish before exiting
+        await background.wait_idle(SHUTDOWN_GRACE_SECONDS)
+        # Digests still inside their coalescing window go out now, not never
+        await broadcaster.flush_pending(bot, SHUTDOWN_GRACE_SECONDS)
+        # Hand the lease over right away instead of making others wait for expiry
+        await leader.resign()
+        # Commit writes still queued in the storage writer
+        await db.close_db()
+        if recorder:
+            recorder.close()
 
 
 if __name__ == "__main__":
@@ -1,10 +1,11 @@
 import os
-from typing import List
+from typing import Dict, List, Tuple
 
 
 # Telegram bot token. Set your real token here or via BOT_TOKEN env var.
-   BOT_TOKEN: str = os.getenv("BOT_TOKEN", "")
-# List of Telegram user IDs who are bot admins.
+BOT_TOKEN: str = os.getenv("BOT_TOKEN", "")
+# Telegram user IDs of the initial bot admins. They seed the admins table on
+# first start; after that the roster is managed with /addadmin and /deladmin.
 ADMIN_IDS: List[int] = [
      6777624915,
 ]
@@ -18,3 +19,116 @@ DATABASE_PATH: str = os.getenv("DATABASE_PATH", os.path.join(os.path.dirname(__f
 # Interval in seconds for the scheduled deletion worker.
 SCHEDULE_INTERVAL_SECONDS: int = 30
 
+
+# Approvals in the same segment within this many seconds are merged into one
+# digest broadcast. 0 disables coalescing (every approval is sent right away).
+BROADCAST_COALESCE_SECONDS: int = int(os.getenv("BROADCAST_COALESCE_SECONDS", "0"))
+
+# The progress card of a broadcast is edited at most once per this many
+# seconds (Telegram limits how often one message can be edited).
+BROADCAST_PROGRESS_EDIT_SECONDS: float = 3.0
+
+# Per-player limit on submitted requests: a bucket of REQUEST_BUCKET_CAPACITY
+# requests, refilled by one every REQUEST_BUCKET_REFILL_SECONDS.
+REQUEST_BUCKET_CAPACITY: int = 3
+REQUEST_BUCKET_REFILL_SECONDS: int = 10 * 60
+
+# Global flood control: at most FLOOD_RATE_LIMIT updates per user within any
+# FLOOD_RATE_WINDOW_SECONDS; excess updates are dropped. Only the most recent
+# FLOOD_TRACKED_USERS_MAX users are tracked.
+FLOOD_RATE_LIMIT: int = 20
+FLOOD_RATE_WINDOW_SECONDS: int = 10
+FLOOD_TRACKED_USERS_MAX: int = 50_000
+
+# Maximum age in seconds of rows kept per table by the retention worker.
+# The daily_stats rollup is not purged, so /stats keeps working for older days.
+# Telegram cannot delete bot messages older than 48 hours, so scheduled
+# deletions past that point can only fail. Requests whose player, format or
+# limit no longer exists are purged regardless of age.
+RETENTION_POLICIES: Dict[str, int] = {
+    "scheduled_deletions": 2 * 24 * 60 * 60,
+    "requests": 7 * 24 * 60 * 60,
+    "events": 90 * 24 * 60 * 60,
+}
+
+# How often the retention worker runs, rows deleted per transaction and pages
+# returned to the OS per run by incremental vacuum.
+RETENTION_INTERVAL_SECONDS: int = 60 * 60
+RETENTION_BATCH_SIZE: int = 500
+RETENTION_VACUUM_PAGES: int = 1000
+
+# Storage backend: "sqlite" (DATABASE_PATH) or "memory" (nothing persisted;
+# for benchmarks and single-process experiments).
+STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "sqlite")
+
+# Retry policy for failed Telegram sends: transient errors are retried with
+# exponential backoff (base doubling up to the max, with jitter), RetryAfter
+# waits the time Telegram asks for. At most DELIVERY_MAX_ATTEMPTS attempts per
+# message and DELIVERY_QUEUE_MAX messages waiting for a retry.
+DELIVERY_MAX_ATTEMPTS: int = 5
+DELIVERY_BACKOFF_BASE_SECONDS: float = 1.0
+DELIVERY_BACKOFF_MAX_SECONDS: float = 60.0
+DELIVERY_QUEUE_MAX: int = 10_000
+
+# Background work (scheduled deletions, retention) runs only in the instance
+# holding the leader lease. The leader renews it every LEADER_RENEW_SECONDS;
+# if it stops doing so, another instance takes over after LEADER_LEASE_SECONDS.
+# At the same interval every instance reloads the caches (admins, bans,
+# catalog, segment index) whose data another instance changed.
+LEADER_LEASE_SECONDS: int = 30
+LEADER_RENEW_SECONDS: int = 10
+
+# Work continued in the background after a callback is acknowledged: at most
+# BACKGROUND_TASKS_MAX run at once and at most BACKGROUND_TASKS_QUEUE_MAX are
+# accepted (running or waiting) before new ones are refused. Broadcasts can
+# run for an hour, so they have their own BACKGROUND_BROADCASTS_MAX slots
+# and never hold up request submissions.
+BACKGROUND_TASKS_MAX: int = 8
+BACKGROUND_BROADCASTS_MAX: int = 2
+BACKGROUND_TASKS_QUEUE_MAX: int = 200
+# How long shutdown waits for that background work to finish.
+SHUTDOWN_GRACE_SECONDS: int = 30
+
+# Items per page in the format/limit choice keyboards (Telegram allows at most
+# 100 buttons per keyboard) and lines per page of the /segments listing
+# (messages are limited to 4096 characters).
+CATALOG_PAGE_SIZE: int = 8
+SEGMENTS_PAGE_SIZE: int = 25
+
+# /find: results per page and the longest query kept (in UTF-8 bytes), so the
+# query fits into the 64-byte callback data of the page buttons.
+FIND_PAGE_SIZE: int = 20
+FIND_QUERY_MAX_BYTES: int = 48
+
+# Update handling concurrency: at most UPDATE_CONCURRENCY_MAX updates are
+# handled at once, the rest wait in line. Once UPDATE_QUEUE_MAX are waiting,
+# new messages from players are dropped; button presses and admins still wait.
+# ROUTER_CONCURRENCY sets the same (limit, queue) pair per router.
+UPDATE_CONCURRENCY_MAX: int = 32
+UPDATE_QUEUE_MAX: int = 200
+ROUTER_CONCURRENCY: Dict[str, Tuple[int, int]] = {
+    "user": (24, 150),
+    "admin": (4, 50),
+    "moderation": (8, 50),
+}
+
+# Event loop lag monitor: the loop is sampled every LOOP_MONITOR_INTERVAL_SECONDS;
+# a stall longer than LOOP_LAG_THRESHOLD_SECONDS is logged together with the
+# stack of the blocked loop thread, and the last LOOP_STALLS_KEPT are kept for /lag.
+LOOP_MONITOR_INTERVAL_SECONDS: float = 0.5
+LOOP_LAG_THRESHOLD_SECONDS: float = 0.1
+LOOP_STALLS_KEPT: int = 10
+
+# Append every incoming update, with user/chat ids and names anonymized, to
+# this JSONL file for offline replay (python -m bot.replay). Empty = disabled.
+UPDATES_RECORD_PATH: str = os.getenv("UPDATES_RECORD_PATH", "")
+
+# Auto-approval: a request skips moderation and is broadcast right away when
+# every rule holds: the player already had AUTO_APPROVE_MIN_APPROVALS requests
+# approved (0 turns auto-approval off), its segment is in
+# AUTO_APPROVE_SEGMENT_IDS (empty = any segment) and the local hour is within
+# AUTO_APPROVE_HOURS = (start, end), e.g. the admins' quiet hours. The window
+# may wrap midnight; equal start and end mean any hour.
+AUTO_APPROVE_MIN_APPROVALS: int = int(os.getenv("AUTO_APPROVE_MIN_APPROVALS", "0"))
+AUTO_APPROVE_SEGMENT_IDS: List[int] = []
+AUTO_APPROVE_HOURS: Tuple[int, int] = (0, 0)
@@ -1,140 +1,79 @@
 import time
-from typing import Any, Dict, List, Optional, Sequence
-
-import aiosqlite
-
-from bot.config import DATABASE_PATH
-
-
-async def init_db() -> None:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        await db.executescript(
-            """
-            PRAGMA foreign_keys = ON;
-
-            CREATE TABLE IF NOT EXISTS players (
-                internal_id   INTEGER PRIMARY KEY AUTOINCREMENT,
-                tg_id         INTEGER UNIQUE,
-                username      TEXT,
-                nick          TEXT,
-                is_banned     INTEGER DEFAULT 0,
-                created_at    INTEGER
-            );
-
-            CREATE TABLE IF NOT EXISTS game_formats (
-                id   INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE
-            );
-
-            CREATE TABLE IF NOT EXISTS limits (
-                id   INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE
-            );
-
-            CREATE TABLE IF NOT EXISTS format_limits (
-                id        INTEGER PRIMARY KEY AUTOINCREMENT,
-                format_id INTEGER NOT NULL,
-                limit_id  INTEGER NOT NULL,
-                UNIQUE (format_id, limit_id),
-                FOREIGN KEY(format_id) REFERENCES game_formats(id) ON DELETE CASCADE,
-                FOREIGN KEY(limit_id) REFERENCES limits(id) ON DELETE CASCADE
-            );
-
-            CREATE TABLE IF NOT EXISTS segments (
-                id        INTEGER PRIMARY KEY AUTOINCREMENT,
-                format_id INTEGER NOT NULL,
-                limit_id  INTEGER NOT NULL,
-                UNIQUE (format_id, limit_id),
-                FOREIGN KEY(format_id) REFERENCES game_formats(id) ON DELETE CASCADE,
-                FOREIGN KEY(limit_id) REFERENCES limits(id) ON DELETE CASCADE
-            );
-
-            CREATE TABLE IF NOT EXISTS segment_assignments (
-                player_id  INTEGER NOT NULL,
-                segment_id INTEGER NOT NULL,
-                UNIQUE (player_id, segment_id),
-                FOREIGN KEY(player_id) REFERENCES players(internal_id) ON DELETE CASCADE,
-                FOREIGN KEY(segment_id) REFERENCES segments(id) ON DELETE CASCADE
-            );
-
-            CREATE TABLE IF NOT EXISTS requests (
-                id         INTEGER PRIMARY KEY AUTOINCREMENT,
-                player_id  INTEGER NOT NULL,
-                format_id  INTEGER NOT NULL,
-                limit_id   INTEGER NOT NULL,
-                created_at INTEGER NOT NULL,
-                FOREIGN KEY(player_id) REFERENCES players(internal_id) ON DELETE CASCADE,
-                FOREIGN KEY(format_id) REFERENCES game_formats(id) ON DELETE CASCADE,
-                FOREIGN KEY(limit_id) REFERENCES limits(id) ON DELETE CASCADE
-            );
-
-            CREATE TABLE IF NOT EXISTS scheduled_deletions (
-                id         INTEGER PRIMARY KEY AUTOINCREMENT,
-                chat_id    INTEGER NOT NULL,
-                message_id INTEGER NOT NULL,
-                delete_at  INTEGER NOT NULL
-            );
-            """
-        )
-        await db.commit()
-
-
-async def _fetchone(query: str, params: Sequence[Any] = ()) -> Optional[aiosqlite.Row]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute(query, params) as cursor:
-            return await cursor.fetchone()
-
-
-async def _fetchall(query: str, params: Sequence[Any] = ()) -> List[aiosqlite.Row]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute(query, params) as cursor:
-            return await cursor.fetchall()
-
-
-async def _execute(query: str, params: Sequence[Any] = ()) -> None:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        await db.execute(query, params)
-        await db.commit()
+from typing import Any, AsyncIterator, Dict, FrozenSet, List, Optional, Set, Tuple
 
+from bot.config import ADMIN_IDS, DATABASE_PATH, STORAGE_BACKEND
+from bot.segment_index import segment_index
+from bot.storage import (
+    Format,
+    Limit,
+    Player,
+    Request,
+    ScheduledDeletion,
+    Segment,
+    Storage,
+    create_storage,
+)
+from bot.storage.base import (  # noqa: F401  (re-exported for handlers)
+    EVENT_BROADCAST_FAILED,
+    EVENT_BROADCAST_SENT,
+    EVENT_REQUEST_APPROVED,
+    EVENT_REQUEST_CREATED,
+    EVENT_REQUEST_REJECTED,
+    SECONDS_PER_DAY,
+    search_terms,
+)
+
+
+_storage: Storage = create_storage(STORAGE_BACKEND, DATABASE_PATH)
+
+
+def get_storage() -> Storage:
+    return _storage
+
+
+def use_storage(storage: Storage) -> None:
+    """Swap the backend (benchmarks, tests) and drop every cache built on the old one."""
+    global _storage, _banned_tg_ids, _admin_ids, _cache_versions
+    _storage = storage
+    _banned_tg_ids = None
+    _cache_versions = {}
+    _admin_ids = frozenset(ADMIN_IDS)
+    _invalidate_catalog()
+    segment_index.loaded = False
 
-# Players
 
+async def init_db() -> bool:
+    """Create or upgrade the schema; returns False if it was already current."""
+    return await _storage.init()
 
-async def get_or_create_player(tg_id: int, username: Optional[str]) -> Dict[str, Any]:
-    row = await _fetchone("SELECT * FROM players WHERE tg_id = ?", (tg_id,))
-    if row:
-        return dict(row)
 
-    created_at = int(time.time())
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        cursor = await db.execute(
-            "INSERT INTO players (tg_id, username, created_at) VALUES (?, ?, ?)",
-            (tg_id, username, created_at),
-        )
-        await db.commit()
-        internal_id = cursor.lastrowid
+async def close_db() -> None:
+    await _storage.close()
 
-    new_row = await _fetchone("SELECT * FROM players WHERE internal_id = ?", (internal_id,))
-    return dict(new_row) if new_row else {}
+
+# Players
+
+
+async def get_or_create_player(tg_id: int, username: Optional[str]) -> Player:
+    player = await _storage.get_player_by_tg_id(tg_id)
+    if player:
+        return player
+    return await _storage.create_player(tg_id, username, int(time.time()))
 
 
 async def update_player_username(tg_id: int, username: Optional[str]) -> None:
-    await _execute("UPDATE players SET username = ? WHERE tg_id = ?", (username, tg_id))
+    await _storage.update_player_username(tg_id, username)
 
 
-async def get_player_by_internal_id(internal_id: int) -> Optional[Dict[str, Any]]:
-    row = await _fetchone("SELECT * FROM players WHERE internal_id = ?", (internal_id,))
-    return dict(row) if row else None
+async def get_player_by_internal_id(internal_id: int) -> Optional[Player]:
+    return await _storage.get_player_by_internal_id(internal_id)
 
 
-async def get_player_by_tg_id(tg_id: int) -> Optional[Dict[str, Any]]:
-    row = await _fetchone("SELECT * FROM players WHERE tg_id = ?", (tg_id,))
-    return dict(row) if row else None
+async def get_player_by_tg_id(tg_id: int) -> Optional[Player]:
+    return await _storage.get_player_by_tg_id(tg_id)
 
 
-async def get_player_by_any_id(identifier: int) -> Optional[Dict[str, Any]]:
+async def get_player_by_any_id(identifier: int) -> Optional[Player]:
     # Internal id has priority
     player = await get_player_by_internal_id(identifier)
     if player:
@@ -142,225 +81,460 @@ async def get_player_by_any_id(identifier: int) -> Optional[Dict[str, Any]]:
     return await get_player_by_tg_id(identifier)
 
 
+async def search_players(query: str, page: int, page_size: int) -> Tuple[List[Player], bool]:
+    """Prefix search by nick/username; returns the page and whether a next page exists."""
+    players = await _storage.search_players(search_terms(query), page * page_size, page_size + 1)
+    return players[:page_size], len(players) > page_size
+
+
+def iter_players_with_segments(page_size: int = 1000) -> AsyncIterator[List[Tuple[Any, ...]]]:
+    return _storage.iter_players_with_segments(page_size)
+
+
 async def set_player_nick(internal_id: int, nick: str) -> None:
-    await _execute("UPDATE players SET nick = ? WHERE internal_id = ?", (nick, internal_id))
+    await _storage.set_player_nick(internal_id, nick)
+
+
+# tg_ids of banned players; None until loaded. The generation counter lets a
+# load that raced with a ban/unban discard its stale result.
+_banned_tg_ids: Optional[Set[int]] = None
+_ban_generation = 0
+
+
+async def load_ban_cache() -> None:
+    global _banned_tg_ids
+    generation = _ban_generation
+    tg_ids = await _storage.get_banned_tg_ids()
+    if generation == _ban_generation:
+        _banned_tg_ids = set(tg_ids)
 
 
 async def set_player_ban(internal_id: int, banned: bool) -> None:
-    await _execute(
-        "UPDATE players SET is_banned = ? WHERE internal_id = ?",
-        (1 if banned else 0, internal_id),
-    )
+    global _ban_generation
+    await _storage.set_player_ban(internal_id, banned)
+    _ban_generation += 1
+    _bump_index_generation()
+    segment_index.set_banned(internal_id, banned)
+    await _storage.bump_cache_version(CACHE_BANS)
+    await _storage.bump_cache_version(CACHE_SEGMENTS)
+    if _banned_tg_ids is not None:
+        player = await _storage.get_player_by_internal_id(internal_id)
+        if player and player.tg_id is not None:
+            if banned:
+                _banned_tg_ids.add(player.tg_id)
+            else:
+                _banned_tg_ids.discard(player.tg_id)
+
+
+async def set_player_unreachable(tg_id: int, unreachable: bool) -> None:
+    player = await _storage.get_player_by_tg_id(tg_id)
+    if not player or bool(player.is_unreachable) == unreachable:
+        return
+    await _storage.set_player_unreachable(player.internal_id, unreachable)
+    _bump_index_generation()
+    segment_index.set_unreachable(player.internal_id, unreachable)
 
 
 async def is_banned_by_tg_id(tg_id: int) -> bool:
-    row = await _fetchone("SELECT is_banned FROM players WHERE tg_id = ?", (tg_id,))
-    if not row:
+    if _banned_tg_ids is not None:
+        return tg_id in _banned_tg_ids
+    player = await _storage.get_player_by_tg_id(tg_id)
+    if not player:
         return False
-    return bool(row["is_banned"])
+    return bool(player.is_banned)
+
+
+# Admins
+
+# Replaced as a whole on every change, so readers never see a half-updated
+# roster. Until load_admins() runs, the ADMIN_IDS from the config apply.
+_admin_ids: FrozenSet[int] = frozenset(ADMIN_IDS)
+
+
+def is_admin(tg_id: int) -> bool:
+    return tg_id in _admin_ids
+
+
+def get_admin_ids() -> FrozenSet[int]:
+    return _admin_ids
+
+
+async def load_admins() -> None:
+    """Load the roster; an empty admins table is seeded with ADMIN_IDS."""
+    global _admin_ids
+    tg_ids = await _storage.get_admin_ids()
+    if not tg_ids:
+        now = int(time.time())
+        for tg_id in ADMIN_IDS:
+            await _storage.add_admin(tg_id, None, now)
+        tg_ids = await _storage.get_admin_ids()
+    _admin_ids = frozenset(tg_ids)
+
+
+async def add_admin(tg_id: int, added_by: int) -> bool:
+    global _admin_ids
+    added = await _storage.add_admin(tg_id, added_by, int(time.time()))
+    _admin_ids = frozenset(await _storage.get_admin_ids())
+    await _storage.bump_cache_version(CACHE_ADMINS)
+    return added
+
+
+async def remove_admin(tg_id: int) -> bool:
+    global _admin_ids
+    removed = await _storage.remove_admin(tg_id)
+    _admin_ids = frozenset(await _storage.get_admin_ids())
+    await _storage.bump_cache_version(CACHE_ADMINS)
+    return removed
+
+
+def cache_sizes() -> Dict[str, int]:
+    """Entry counts of the in-process caches, for memory diagnostics."""
+    sizes = {
+        "banned_tg_ids": len(_banned_tg_ids) if _banned_tg_ids is not None else 0,
+        "admins": len(_admin_ids),
+        "catalog_formats": len(_catalog.formats) if _catalog is not None else 0,
+        "catalog_limits": len(_catalog.limit_by_id) if _catalog is not None else 0,
+        "catalog_pages": len(_catalog.pages) if _catalog is not None else 0,
+    }
+    for key, value in segment_index.stats().items():
+        sizes[f"segment_index_{key}"] = value
+    return sizes
 
 
 # Formats and limits
 
 
+class _Catalog:
+    __slots__ = ("formats", "format_by_id", "limit_by_id", "limits_by_format", "pages")
+
+    def __init__(
+        self,
+        formats: List[Format],
+        limits: List[Limit],
+        links: List[Tuple[int, int]],
+    ) -> None:
+        self.formats = formats
+        self.format_by_id = {f.id: f for f in formats}
+        self.limit_by_id = {lim.id: lim for lim in limits}
+        self.limits_by_format: Dict[int, List[Limit]] = {}
+        for format_id, limit_id in links:
+            limit = self.limit_by_id.get(limit_id)
+            if limit is not None:
+                self.limits_by_format.setdefault(format_id, []).append(limit)
+        # (format_id or None for formats, page, page_size) -> (items, page_count)
+        self.pages: Dict[Tuple[Optional[int], int, int], Tuple[List[Any], int]] = {}
+
+    def page(
+        self, items: List[Any], key: Optional[int], page: int, page_size: int
+    ) -> Tuple[List[Any], int, int]:
+        page_count = max(1, -(-len(items) // page_size))
+        page = min(max(page, 0), page_count - 1)
+        cached = self.pages.get((key, page, page_size))
+        if cached is None:
+            cached = (items[page * page_size:(page + 1) * page_size], page_count)
+            self.pages[(key, page, page_size)] = cached
+        return cached[0], page, cached[1]
+
+
+# Formats, limits and their links are tiny and read on every wizard step, so
+# they are cached as a whole and dropped on any catalog write.
+_catalog: Optional[_Catalog] = None
+_catalog_generation = 0
+
+
+def _invalidate_catalog() -> None:
+    global _catalog, _catalog_generation
+    _catalog = None
+    _catalog_generation += 1
+
+
+async def load_catalog() -> None:
+    await _get_catalog()
+
+
+async def _get_catalog() -> _Catalog:
+    global _catalog
+    if _catalog is not None:
+        return _catalog
+    generation = _catalog_generation
+    catalog = _Catalog(
+        await _storage.get_formats(),
+        await _storage.get_limits(),
+        await _storage.get_format_limit_links(),
+    )
+    if generation == _catalog_generation:
+        _catalog = catalog
+    return catalog
+
+
 async def add_format(name: str) -> int:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        cursor = await db.execute(
-            "INSERT OR IGNORE INTO game_formats (name) VALUES (?)",
-            (name,),
-        )
-        await db.commit()
-        if cursor.lastrowid:
-            return cursor.lastrowid
-    row = await _fetchone("SELECT id FROM game_formats WHERE name = ?", (name,))
-    return int(row["id"]) if row else 0
+    format_id = await _storage.add_format(name)
+    _invalidate_catalog()
+    await _storage.bump_cache_version(CACHE_CATALOG)
+    return format_id
 
 
 async def add_limit(name: str) -> int:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        cursor = await db.execute(
-            "INSERT OR IGNORE INTO limits (name) VALUES (?)",
-            (name,),
-        )
-        await db.commit()
-        if cursor.lastrowid:
-            return cursor.lastrowid
-    row = await _fetchone("SELECT id FROM limits WHERE name = ?", (name,))
-    return int(row["id"]) if row else 0
+    limit_id = await _storage.add_limit(name)
+    _invalidate_catalog()
+    await _storage.bump_cache_version(CACHE_CATALOG)
+    return limit_id
 
 
 async def link_format_limit(format_id: int, limit_id: int) -> None:
-    await _execute(
-        "INSERT OR IGNORE INTO format_limits (format_id, limit_id) VALUES (?, ?)",
-        (format_id, limit_id),
-    )
+    await _storage.link_format_limit(format_id, limit_id)
+    _invalidate_catalog()
+    await _storage.bump_cache_version(CACHE_CATALOG)
 
 
-async def get_all_formats() -> List[Dict[str, Any]]:
-    rows = await _fetchall("SELECT id, name FROM game_formats ORDER BY id")
-    return [dict(r) for r in rows]
+async def get_all_formats() -> List[Format]:
+    return (await _get_catalog()).formats
 
 
-async def get_limits_for_format(format_id: int) -> List[Dict[str, Any]]:
-    rows = await _fetchall(
-        """
-        SELECT l.id, l.name
-        FROM limits l
-        JOIN format_limits fl ON fl.limit_id = l.id
-        WHERE fl.format_id = ?
-        ORDER BY l.id
-        """,
-        (format_id,),
-    )
-    return [dict(r) for r in rows]
+async def get_limits_for_format(format_id: int) -> List[Limit]:
+    return (await _get_catalog()).limits_by_format.get(format_id, [])
+
+
+async def get_formats_page(page: int, page_size: int) -> Tuple[List[Format], int, int]:
+    """(formats on the page, page clamped to range, page count)."""
+    catalog = await _get_catalog()
+    return catalog.page(catalog.formats, None, page, page_size)
+
+
+async def get_limits_page(format_id: int, page: int, page_size: int) -> Tuple[List[Limit], int, int]:
+    catalog = await _get_catalog()
+    return catalog.page(catalog.limits_by_format.get(format_id, []), format_id, page, page_size)
 
 
-async def get_format_by_id(format_id: int) -> Optional[Dict[str, Any]]:
-    row = await _fetchone("SELECT * FROM game_formats WHERE id = ?", (format_id,))
-    return dict(row) if row else None
+async def get_format_by_id(format_id: int) -> Optional[Format]:
+    return (await _get_catalog()).format_by_id.get(format_id)
 
 
-async def get_limit_by_id(limit_id: int) -> Optional[Dict[str, Any]]:
-    row = await _fetchone("SELECT * FROM limits WHERE id = ?", (limit_id,))
-    return dict(row) if row else None
+async def get_limit_by_id(limit_id: int) -> Optional[Limit]:
+    return (await _get_catalog()).limit_by_id.get(limit_id)
 
 
 # Segments
 
 
 async def get_or_create_segment(format_id: int, limit_id: int) -> int:
-    row = await _fetchone(
-        "SELECT id FROM segments WHERE format_id = ? AND limit_id = ?",
-        (format_id, limit_id),
-    )
-    if row:
-        return int(row["id"])
-
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        cursor = await db.execute(
-            "INSERT INTO segments (format_id, limit_id) VALUES (?, ?)",
-            (format_id, limit_id),
-        )
-        await db.commit()
-        return cursor.lastrowid
-
-
-async def get_segment_by_pair(format_id: int, limit_id: int) -> Optional[Dict[str, Any]]:
-    row = await _fetchone(
-        "SELECT * FROM segments WHERE format_id = ? AND limit_id = ?",
-        (format_id, limit_id),
-    )
-    return dict(row) if row else None
+    return await _storage.get_or_create_segment(format_id, limit_id)
+
+
+async def get_segment_by_pair(format_id: int, limit_id: int) -> Optional[Segment]:
+    return await _storage.get_segment_by_pair(format_id, limit_id)
+
+
+# Bumped by every write the segment index mirrors: a load that raced with one
+# would install a snapshot missing it, so it is retried instead.
+_index_generation = 0
+_INDEX_LOAD_ATTEMPTS = 3
+
+
+def _bump_index_generation() -> None:
+    global _index_generation
+    _index_generation += 1
+
+
+async def load_segment_index() -> bool:
+    """Build the segment index; False if writes kept racing with the load.
+
+    The index then stays unloaded and audiences are read from storage.
+    """
+    for _ in range(_INDEX_LOAD_ATTEMPTS):
+        generation = _index_generation
+        rows = await _storage.get_segment_assignments()
+        if generation == _index_generation:
+            segment_index.rebuild(rows)
+            return True
+    return False
 
 
 async def assign_segment(player_id: int, segment_id: int) -> None:
-    await _execute(
-        "INSERT OR IGNORE INTO segment_assignments (player_id, segment_id) VALUES (?, ?)",
-        (player_id, segment_id),
-    )
+    await _storage.assign_segment(player_id, segment_id)
+    _bump_index_generation()
+    if segment_index.loaded:
+        player = await _storage.get_player_by_internal_id(player_id)
+        if player:
+            segment_index.assign(
+                player_id,
+                player.tg_id,
+                segment_id,
+                banned=bool(player.is_banned),
+                unreachable=bool(player.is_unreachable),
+            )
+    await _storage.bump_cache_version(CACHE_SEGMENTS)
 
 
 async def unassign_segment(player_id: int, segment_id: int) -> None:
-    await _execute(
-        "DELETE FROM segment_assignments WHERE player_id = ? AND segment_id = ?",
-        (player_id, segment_id),
-    )
+    await _storage.unassign_segment(player_id, segment_id)
+    _bump_index_generation()
+    segment_index.unassign(player_id, segment_id)
+    await _storage.bump_cache_version(CACHE_SEGMENTS)
 
 
 async def get_segments_for_player(player_id: int) -> List[int]:
-    rows = await _fetchall(
-        "SELECT segment_id FROM segment_assignments WHERE player_id = ? ORDER BY segment_id",
-        (player_id,),
-    )
-    return [int(r["segment_id"]) for r in rows]
-
-
-async def get_all_segments_with_names() -> List[Dict[str, Any]]:
-    rows = await _fetchall(
-        """
-        SELECT s.id AS segment_id,
-               s.format_id,
-               s.limit_id,
-               gf.name AS format_name,
-               l.name  AS limit_name
-        FROM segments s
-        JOIN game_formats gf ON gf.id = s.format_id
-        JOIN limits l ON l.id = s.limit_id
-        ORDER BY s.id
-        """
-    )
-    return [dict(r) for r in rows]
-
-
-async def get_players_for_segment(segment_id: int, exclude_player_id: Optional[int] = None) -> List[Dict[str, Any]]:
-    if exclude_player_id is not None:
-        rows = await _fetchall(
-            """
-            SELECT p.*
-            FROM players p
-            JOIN segment_assignments sa ON sa.player_id = p.internal_id
-            WHERE sa.segment_id = ? AND p.internal_id <> ?
-            """,
-            (segment_id, exclude_player_id),
-        )
-    else:
-        rows = await _fetchall(
-            """
-            SELECT p.*
-            FROM players p
-            JOIN segment_assignments sa ON sa.player_id = p.internal_id
-            WHERE sa.segment_id = ?
-            """,
-            (segment_id,),
-        )
-    return [dict(r) for r in rows]
+    if segment_index.loaded:
+        return segment_index.segments_for_player(player_id)
+    return await _storage.get_segments_for_player(player_id)
+
+
+async def get_segments_with_names(offset: int, limit: int) -> List[Dict[str, Any]]:
+    return await _storage.get_segments_with_names(offset, limit)
+
+
+async def count_segments() -> int:
+    return await _storage.count_segments()
+
+
+async def iter_segment_audience(
+    segment_id: int, exclude_tg_id: Optional[int] = None, page_size: int = 1000
+) -> AsyncIterator[int]:
+    """tg_ids of reachable, non-banned segment members, produced as they are consumed.
+
+    Served from the in-memory index once loaded (its copy-on-write array, not
+    a copy), otherwise streamed from storage a page at a time, so a broadcast
+    never holds the whole audience.
+    """
+    if segment_index.loaded:
+        for tg_id in segment_index.audience(segment_id):
+            if tg_id != exclude_tg_id:
+                yield tg_id
+        return
+    async for page in _storage.iter_segment_audience(segment_id, page_size):
+        for tg_id in page:
+            if tg_id != exclude_tg_id:
+                yield tg_id
+
+
+async def count_segment_audience(segment_id: int, exclude_tg_id: Optional[int] = None) -> int:
+    if segment_index.loaded:
+        return segment_index.audience_size(segment_id, exclude_tg_id)
+    return await _storage.count_segment_audience(segment_id, exclude_tg_id)
 
 
 # Requests
 
 
 async def create_request(player_id: int, format_id: int, limit_id: int) -> int:
-    created_at = int(time.time())
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        cursor = await db.execute(
-            "INSERT INTO requests (player_id, format_id, limit_id, created_at) VALUES (?, ?, ?, ?)",
-            (player_id, format_id, limit_id, created_at),
-        )
-        await db.commit()
-        return cursor.lastrowid
+    return await _storage.create_request(player_id, format_id, limit_id, int(time.time()))
+
+
+async def get_request_by_id(request_id: int) -> Optional[Request]:
+    return await _storage.get_request_by_id(request_id)
 
 
-async def get_request_by_id(request_id: int) -> Optional[Dict[str, Any]]:
-    row = await _fetchone("SELECT * FROM requests WHERE id = ?", (request_id,))
-    return dict(row) if row else None
+async def get_pending_request(player_id: int, format_id: int, limit_id: int) -> Optional[Request]:
+    return await _storage.get_pending_request(player_id, format_id, limit_id)
 
 
 async def delete_request(request_id: int) -> None:
-    await _execute("DELETE FROM requests WHERE id = ?", (request_id,))
+    await _storage.delete_request(request_id)
+
+
+# Statistics
+
+
+async def record_event(
+    kind: str,
+    format_id: int,
+    limit_id: int,
+    player_id: Optional[int] = None,
+    value: int = 1,
+) -> None:
+    await _storage.record_event(kind, format_id, limit_id, player_id, value, int(time.time()))
+
+
+async def get_stats_since(since_ts: int) -> List[Dict[str, Any]]:
+    return await _storage.get_stats_since_day(since_ts // SECONDS_PER_DAY)
 
 
 # Scheduled deletions
 
 
 async def schedule_deletion(chat_id: int, message_id: int, delete_at: int) -> None:
-    await _execute(
-        "INSERT INTO scheduled_deletions (chat_id, message_id, delete_at) VALUES (?, ?, ?)",
-        (chat_id, message_id, delete_at),
-    )
+    await _storage.schedule_deletion(chat_id, message_id, delete_at)
 
 
-async def get_due_scheduled_deletions(now_ts: int) -> List[Dict[str, Any]]:
-    rows = await _fetchall(
-        "SELECT id, chat_id, message_id FROM scheduled_deletions WHERE delete_at <= ?",
-        (now_ts,),
-    )
-    return [dict(r) for r in rows]
+async def get_due_scheduled_deletions(now_ts: int) -> List[ScheduledDeletion]:
+    return await _storage.get_due_scheduled_deletions(now_ts)
 
 
 async def delete_scheduled_deletions(ids: List[int]) -> None:
-    if not ids:
-        return
-    placeholders = ",".join("?" for _ in ids)
-    query = f"DELETE FROM scheduled_deletions WHERE id IN ({placeholders})"
-    await _execute(query, list(ids))
+    await _storage.delete_scheduled_deletions(ids)
+
+
+# Retention
+
+
+async def purge_expired_batch(table: str, cutoff_ts: int, batch_size: int) -> int:
+    return await _storage.purge_expired_batch(table, cutoff_ts, batch_size)
+
+
+async def incremental_vacuum(max_pages: int) -> int:
+    return await _storage.incremental_vacuum(max_pages)
+
+
+async def get_storage_report() -> Dict[str, Any]:
+    return await _storage.get_storage_report()
+
+
+# Leases
+
+
+async def try_acquire_lease(name: str, holder: str, ttl_seconds: float) -> bool:
+    return await _storage.try_acquire_lease(name, holder, ttl_seconds, time.time())
+
+
+async def release_lease(name: str, holder: str) -> None:
+    await _storage.release_lease(name, holder)
+
+
+# Cross-instance invalidation: every write behind a cache bumps its version in
+# storage, and each instance polls sync_caches() to reload what changed.
+# Unreachable flags are not shared; an instance learns them from its own sends.
+CACHE_ADMINS = "admins"
+CACHE_BANS = "bans"
+CACHE_CATALOG = "catalog"
+CACHE_SEGMENTS = "segments"
+
+# Versions the local caches were loaded at
+_cache_versions: Dict[str, int] = {}
+
+
+async def load_cache_versions() -> None:
+    """Remember the current versions; call before the caches are first loaded."""
+    global _cache_versions
+    _cache_versions = await _storage.get_cache_versions()
+
+
+async def _reload_cache(name: str) -> bool:
+    global _banned_tg_ids
+    if name == CACHE_ADMINS:
+        await load_admins()
+    elif name == CACHE_BANS:
+        # The database answers until the reload lands
+        _banned_tg_ids = None
+        await load_ban_cache()
+        return _banned_tg_ids is not None
+    elif name == CACHE_CATALOG:
+        _invalidate_catalog()
+    elif name == CACHE_SEGMENTS:
+        if not await load_segment_index():
+            # Audiences come from storage until a later sync loads it
+            segment_index.loaded = False
+            return False
+    return True
+
+
+async def sync_caches() -> List[str]:
+    """Reload the caches whose version changed since they were loaded; returns their names.
 
+    A reload that raced with a local write is retried on the next call.
+    """
+    changed = []
+    for name, version in (await _storage.get_cache_versions()).items():
+        if _cache_versions.get(name) != version and await _reload_cache(name):
+            _cache_versions[name] = version
+            changed.append(name)
+    return changed
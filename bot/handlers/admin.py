@@ -1,24 +1,38 @@
 import logging
-from typing import Optional
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
 
 from aiogram import F, Router
 from aiogram.enums import ChatType
 from aiogram.filters import Command
-from aiogram.types import Message
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery, FSInputFile, InlineKeyboardMarkup, Message
 
 from bot import db, texts
-from bot.config import ADMIN_IDS
-from bot.keyboards import main_menu_kb
+from bot.config import FIND_PAGE_SIZE, FIND_QUERY_MAX_BYTES, SEGMENTS_PAGE_SIZE
+from bot.keyboards import find_results_keyboard, main_menu_kb, segments_page_keyboard
+from bot.middlewares import limiters
+from bot.handlers import background
+from bot.handlers import user as user_module
+from bot.middlewares import flood_control
+from bot.services import broadcaster, delivery, loop_monitor, memstats
+from bot.services.export import export_players_csv_gz
+from bot.storage import Player
 
 
 logger = logging.getLogger(__name__)
 
 router = Router(name="admin")
 router.message.filter(F.chat.type == ChatType.PRIVATE)
+router.callback_query.filter(F.message.chat.type == ChatType.PRIVATE)
 
 
 def _is_admin(user_id: int) -> bool:
-    return user_id in ADMIN_IDS
+    return db.is_admin(user_id)
 
 
 async def _ensure_admin(message: Message) -> bool:
@@ -28,7 +42,7 @@ async def _ensure_admin(message: Message) -> bool:
     return True
 
 
-async def _resolve_player(identifier: int, create_if_missing: bool = False) -> Optional[dict]:
+async def _resolve_player(identifier: int, create_if_missing: bool = False) -> Optional[Player]:
     player = await db.get_player_by_internal_id(identifier)
     if player:
         return player
@@ -57,7 +71,16 @@ async def cmd_admin(message: Message) -> None:
         "/assign tg_id|internal_id segment_id\n"
         "/unassign tg_id|internal_id segment_id\n"
         "/user tg_id|internal_id\n"
-        "/segments"
+        "/find nick|username\n"
+        "/addadmin tg_id\n"
+        "/deladmin tg_id\n"
+        "/admins\n"
+        "/segments\n"
+        "/stats [days]\n"
+        "/load\n"
+        "/lag\n"
+        "/memstats [on|off]\n"
+        "/export"
     )
     await message.answer(text, reply_markup=main_menu_kb)
 
@@ -76,11 +99,62 @@ async def cmd_ban(message: Message) -> None:
         await message.answer(texts.PARSING_ERROR, reply_markup=main_menu_kb)
         return
     player = await _resolve_player(ident, create_if_missing=True)
-    internal_id = int(player["internal_id"])
+    internal_id = player.internal_id
     await db.set_player_ban(internal_id, True)
     await message.answer(texts.BAN_OK, reply_markup=main_menu_kb)
 
 
+async def _parse_tg_id(message: Message) -> Optional[int]:
+    parts = (message.text or "").split()
+    if len(parts) != 2:
+        await message.answer(texts.PARSING_ERROR, reply_markup=main_menu_kb)
+        return None
+    try:
+        return int(parts[1])
+    except ValueError:
+        await message.answer(texts.PARSING_ERROR, reply_markup=main_menu_kb)
+        return None
+
+
+@router.message(Command("addadmin"))
+async def cmd_addadmin(message: Message) -> None:
+    if not await _ensure_admin(message):
+        return
+    tg_id = await _parse_tg_id(message)
+    if tg_id is None:
+        return
+    added = await db.add_admin(tg_id, message.from_user.id)
+    logger.info("Admin %s added admin %s", message.from_user.id, tg_id)
+    text = texts.ADMIN_ADDED_TEXT if added else texts.ADMIN_ALREADY_TEXT
+    await message.answer(text, reply_markup=main_menu_kb)
+
+
+@router.message(Command("deladmin"))
+async def cmd_deladmin(message: Message) -> None:
+    if not await _ensure_admin(message):
+        return
+    tg_id = await _parse_tg_id(message)
+    if tg_id is None:
+        return
+    # Also guarantees at least one admin is always left
+    if tg_id == message.from_user.id:
+        await message.answer(texts.ADMIN_SELF_REMOVE_TEXT, reply_markup=main_menu_kb)
+        return
+    removed = await db.remove_admin(tg_id)
+    logger.info("Admin %s removed admin %s", message.from_user.id, tg_id)
+    text = texts.ADMIN_REMOVED_TEXT if removed else texts.ADMIN_NOT_FOUND_TEXT
+    await message.answer(text, reply_markup=main_menu_kb)
+
+
+@router.message(Command("admins"))
+async def cmd_admins(message: Message) -> None:
+    if not await _ensure_admin(message):
+        return
+    lines = [texts.ADMINS_LIST_HEADER]
+    lines.extend(str(tg_id) for tg_id in sorted(db.get_admin_ids()))
+    await message.answer("\n".join(lines), reply_markup=main_menu_kb)
+
+
 @router.message(Command("unban"))
 async def cmd_unban(message: Message) -> None:
     if not await _ensure_admin(message):
@@ -98,7 +172,7 @@ async def cmd_unban(message: Message) -> None:
     if not player:
         await message.answer(texts.USER_NOT_FOUND_TEXT, reply_markup=main_menu_kb)
         return
-    internal_id = int(player["internal_id"])
+    internal_id = player.internal_id
     await db.set_player_ban(internal_id, False)
     await message.answer(texts.UNBAN_OK, reply_markup=main_menu_kb)
 
@@ -121,7 +195,7 @@ async def cmd_setnick(message: Message) -> None:
     if not player:
         await message.answer(texts.USER_NOT_FOUND_TEXT, reply_markup=main_menu_kb)
         return
-    internal_id = int(player["internal_id"])
+    internal_id = player.internal_id
     await db.set_player_nick(internal_id, new_nick)
     await message.answer(texts.SETNICK_OK, reply_markup=main_menu_kb)
 
@@ -211,7 +285,7 @@ async def cmd_assign(message: Message) -> None:
     if not player:
         await message.answer(texts.USER_NOT_FOUND_TEXT, reply_markup=main_menu_kb)
         return
-    internal_id = int(player["internal_id"])
+    internal_id = player.internal_id
     await db.assign_segment(internal_id, segment_id)
     await message.answer(
         texts.ASSIGNED_TEXT.format(segment_id=segment_id),
@@ -237,7 +311,7 @@ async def cmd_unassign(message: Message) -> None:
     if not player:
         await message.answer(texts.USER_NOT_FOUND_TEXT, reply_markup=main_menu_kb)
         return
-    internal_id = int(player["internal_id"])
+    internal_id = player.internal_id
     await db.unassign_segment(internal_id, segment_id)
     await message.answer(
         texts.UNASSIGNED_TEXT.format(segment_id=segment_id),
@@ -262,26 +336,78 @@ async def cmd_user(message: Message) -> None:
     if not player:
         await message.answer(texts.USER_NOT_FOUND_TEXT, reply_markup=main_menu_kb)
         return
-    segments = await db.get_segments_for_player(int(player["internal_id"]))
+    segments = await db.get_segments_for_player(player.internal_id)
     text = texts.USER_INFO_TEMPLATE.format(
-        internal_id=player["internal_id"],
-        tg_id=player["tg_id"],
-        username=player.get("username") or "-",
-        nick=player.get("nick") or "-",
-        is_banned=player.get("is_banned", 0),
+        internal_id=player.internal_id,
+        tg_id=player.tg_id,
+        username=player.username or "-",
+        nick=player.nick or "-",
+        is_banned=player.is_banned,
         segments=", ".join(str(s) for s in segments) if segments else "-",
     )
     await message.answer(text, reply_markup=main_menu_kb)
 
 
-@router.message(Command("segments"))
-async def cmd_segments(message: Message) -> None:
+def _truncate_utf8(text: str, max_bytes: int) -> str:
+    return text.encode("utf-8")[:max_bytes].decode("utf-8", errors="ignore")
+
+
+async def _find_page(query: str, page: int) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+    players, has_next = await db.search_players(query, page, FIND_PAGE_SIZE)
+    if not players:
+        return texts.FIND_EMPTY_TEXT, None
+    lines = [texts.FIND_HEADER_TEMPLATE.format(query=texts.html_safe(query), page=page + 1)]
+    for player in players:
+        lines.append(
+            texts.FIND_ITEM_TEMPLATE.format(
+                internal_id=player.internal_id,
+                tg_id=player.tg_id,
+                username=texts.html_safe(player.username or "-"),
+                nick=texts.html_safe(player.nick or "-"),
+            )
+        )
+    return "\n".join(lines), find_results_keyboard(query, page, has_next)
+
+
+@router.message(Command("find"))
+async def cmd_find(message: Message) -> None:
     if not await _ensure_admin(message):
         return
-    segments = await db.get_all_segments_with_names()
-    if not segments:
-        await message.answer("Сегменты не настроены.", reply_markup=main_menu_kb)
+    parts = (message.text or "").split(maxsplit=1)
+    query = _truncate_utf8(parts[1].strip(), FIND_QUERY_MAX_BYTES) if len(parts) == 2 else ""
+    if not db.search_terms(query):
+        await message.answer(texts.PARSING_ERROR, reply_markup=main_menu_kb)
         return
+    text, kb = await _find_page(query, 0)
+    await message.answer(text, reply_markup=kb or main_menu_kb)
+
+
+@router.callback_query(F.data.startswith("find:"))
+async def on_find_page(callback: CallbackQuery) -> None:
+    if not _is_admin(callback.from_user.id):
+        await callback.answer("Нет прав для этого действия.", show_alert=True)
+        return
+    try:
+        _, page_str, query = (callback.data or "").split(":", maxsplit=2)
+        page = max(int(page_str), 0)
+    except ValueError:
+        await callback.answer("Некорректные данные.", show_alert=True)
+        return
+    await callback.answer()
+    text, kb = await _find_page(query, page)
+    try:
+        await callback.message.edit_text(text, reply_markup=kb)
+    except TelegramBadRequest:
+        pass
+
+
+async def _segments_page(page: int) -> Tuple[Optional[str], Optional[InlineKeyboardMarkup]]:
+    total = await db.count_segments()
+    if not total:
+        return None, None
+    page_count = -(-total // SEGMENTS_PAGE_SIZE)
+    page = min(max(page, 0), page_count - 1)
+    segments = await db.get_segments_with_names(page * SEGMENTS_PAGE_SIZE, SEGMENTS_PAGE_SIZE)
     lines = [texts.SEGMENTS_LIST_HEADER]
     for seg in segments:
         lines.append(
@@ -293,4 +419,261 @@ async def cmd_segments(message: Message) -> None:
                 limit_id=seg["limit_id"],
             )
         )
+    return "\n".join(lines), segments_page_keyboard(page, page_count)
+
+
+@router.message(Command("segments"))
+async def cmd_segments(message: Message) -> None:
+    if not await _ensure_admin(message):
+        return
+    text, kb = await _segments_page(0)
+    if text is None:
+        await message.answer("Сегменты не настроены.", reply_markup=main_menu_kb)
+        return
+    await message.answer(text, reply_markup=kb or main_menu_kb)
+
+
+@router.callback_query(F.data.startswith("segp:"))
+async def on_segments_page(callback: CallbackQuery) -> None:
+    if not _is_admin(callback.from_user.id):
+        await callback.answer("Нет прав для этого действия.", show_alert=True)
+        return
+    try:
+        page = int((callback.data or "").split(":", maxsplit=1)[1])
+    except (IndexError, ValueError):
+        await callback.answer("Некорректные данные.", show_alert=True)
+        return
+    await callback.answer()
+    text, kb = await _segments_page(page)
+    if text is None:
+        await callback.message.edit_text("Сегменты не настроены.")
+        return
+    try:
+        await callback.message.edit_text(text, reply_markup=kb)
+    except TelegramBadRequest:
+        # Same page clicked twice: "message is not modified"
+        pass
+
+
+@router.message(Command("load"))
+async def cmd_load(message: Message) -> None:
+    if not await _ensure_admin(message):
+        return
+    lines = [
+        texts.LOAD_ITEM_TEMPLATE.format(name=name, **limiter.stats())
+        for name, limiter in limiters.items()
+    ]
+    lines.append(texts.LOAD_FLOOD_TEMPLATE.format(**flood_control.stats()))
     await message.answer("\n".join(lines), reply_markup=main_menu_kb)
+
+
+# Lines of each stall stack shown in /lag; the innermost frames are the useful ones
+_LAG_STACK_LINES = 12
+
+
+def _fit_pre(text: str, budget: int, keep_end: bool = False) -> str:
+    """HTML-escape ``text`` for a <pre> block, at most ``budget`` characters once escaped.
+
+    Whole lines are dropped first (from the start with ``keep_end``), so the
+    cut never splits an entity or the markup around it.
+    """
+    lines = text.splitlines()
+    escaped = texts.html_safe("\n".join(lines))
+    while len(escaped) > budget and len(lines) > 1:
+        lines.pop(0 if keep_end else -1)
+        escaped = texts.html_safe("\n".join(lines))
+    # A single line still too long is cut; an escaped character takes at most 6
+    raw = "\n".join(lines)[:max(budget, 0)]
+    escaped = texts.html_safe(raw)
+    while len(escaped) > budget:
+        raw = raw[:len(raw) - max(1, (len(escaped) - budget) // 6)]
+        escaped = texts.html_safe(raw)
+    return escaped
+
+
+@router.message(Command("lag"))
+async def cmd_lag(message: Message) -> None:
+    if not await _ensure_admin(message):
+        return
+    parts = [texts.LAG_TEMPLATE.format(**loop_monitor.stats())]
+    # Newest last, and only as many as fit into one message
+    stalls = list(loop_monitor.stalls)[-3:]
+    for stall in stalls:
+        stall_text = texts.LAG_STALL_TEMPLATE.format(
+            at=time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(stall.at)),
+            lag_ms=stall.lag * 1000,
+            stack="{stack}",
+        )
+        # Each stack gets an equal share of what the headers leave free
+        budget = (texts.MESSAGE_MAX_LENGTH - len(parts[0])) // len(stalls) - len(stall_text) - 2
+        stack = "\n".join(stall.stack.splitlines()[-_LAG_STACK_LINES:])
+        parts.append(stall_text.format(stack=_fit_pre(stack, budget, keep_end=True)))
+    await message.answer("\n\n".join(parts), reply_markup=main_menu_kb)
+
+
+# Entries per /memstats section, to stay within one message
+_MEMSTATS_ITEMS = 8
+
+
+def _memstats_section(header: str, lines: List[str]) -> str:
+    budget = texts.MESSAGE_MAX_LENGTH - len(header) - len("\n<pre></pre>")
+    return header + "\n<pre>" + _fit_pre("\n".join(lines), budget) + "</pre>"
+
+
+def _fsm_size(fsm_storage: BaseStorage) -> str:
+    if isinstance(fsm_storage, MemoryStorage):
+        return str(len(fsm_storage.storage))
+    return type(fsm_storage).__name__
+
+
+@router.message(Command("memstats"))
+async def cmd_memstats(message: Message, fsm_storage: BaseStorage) -> None:
+    if not await _ensure_admin(message):
+        return
+    parts = (message.text or "").split()
+    if len(parts) > 2 or (len(parts) == 2 and parts[1] not in ("on", "off")):
+        await message.answer(texts.PARSING_ERROR, reply_markup=main_menu_kb)
+        return
+    if len(parts) == 2:
+        if parts[1] == "on":
+            memstats.start_tracing()
+        else:
+            memstats.stop_tracing()
+        state = "вкл." if memstats.is_tracing() else "выкл."
+        await message.answer(texts.MEMSTATS_TRACE_TEMPLATE.format(state=state), reply_markup=main_menu_kb)
+        return
+
+    caches = db.cache_sizes()
+    caches["flood_tracked_users"] = len(flood_control.limiter)
+    caches["request_buckets"] = len(user_module.request_limiter)
+    caches["delivery_retry_queue"] = delivery.queue_size()
+    caches["broadcast_digest_pending"] = broadcaster.pending_count()
+    caches["background_tasks"] = background.pending_count()
+
+    rss, current = memstats.rss_bytes()
+    text = texts.MEMSTATS_TEMPLATE.format(
+        rss_mb=rss / 1024 / 1024,
+        rss_note="" if current else " (пик)",
+        fsm_size=_fsm_size(fsm_storage),
+        caches="\n".join(f"{name}: {size}" for name, size in caches.items()),
+        types="\n".join(
+            f"{texts.html_safe(name)}: {count}" for name, count in memstats.top_types(_MEMSTATS_ITEMS)
+        ),
+    )
+    chunks = [text]
+    if memstats.is_tracing():
+        top, diff = memstats.allocation_report(_MEMSTATS_ITEMS)
+        chunks.append(_memstats_section(texts.MEMSTATS_TOP_HEADER, top))
+        if diff:
+            chunks.append(_memstats_section(texts.MEMSTATS_DIFF_HEADER, diff))
+    else:
+        chunks.append(texts.MEMSTATS_TRACE_HINT)
+    # Allocation listings can be long; each goes out as its own message
+    for chunk in chunks:
+        await message.answer(chunk, reply_markup=main_menu_kb)
+
+
+def _chunk_lines(lines: List[str], limit: int = texts.MESSAGE_MAX_LENGTH) -> List[str]:
+    """Join ``lines`` into as few messages of at most ``limit`` characters as possible."""
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in lines:
+        if current and size + len(line) + 1 > limit:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+@router.message(Command("stats"))
+async def cmd_stats(message: Message) -> None:
+    if not await _ensure_admin(message):
+        return
+    parts = (message.text or "").split()
+    if len(parts) > 2:
+        await message.answer(texts.PARSING_ERROR, reply_markup=main_menu_kb)
+        return
+    try:
+        days = int(parts[1]) if len(parts) == 2 else 7
+    except ValueError:
+        await message.answer(texts.PARSING_ERROR, reply_markup=main_menu_kb)
+        return
+    days = max(days, 1)
+
+    # Today counts as the first day of the period
+    since_ts = int(time.time()) - (days - 1) * 24 * 60 * 60
+    rows = await db.get_stats_since(since_ts)
+    if not rows:
+        await message.answer(texts.STATS_EMPTY_TEXT, reply_markup=main_menu_kb)
+        return
+
+    totals: Dict[str, int] = {}
+    pairs: Dict[Tuple[int, int], Dict[str, object]] = {}
+    for row in rows:
+        kind = row["kind"]
+        totals[kind] = totals.get(kind, 0) + int(row["value"])
+        pair = pairs.setdefault(
+            (row["format_id"], row["limit_id"]),
+            {
+                "format_name": texts.html_safe(row["format_name"] or str(row["format_id"])),
+                "limit_name": texts.html_safe(row["limit_name"] or str(row["limit_id"])),
+            },
+        )
+        pair[kind] = int(row["value"])
+
+    approved = totals.get(db.EVENT_REQUEST_APPROVED, 0)
+    rejected = totals.get(db.EVENT_REQUEST_REJECTED, 0)
+    moderated = approved + rejected
+    lines = [
+        texts.STATS_HEADER_TEMPLATE.format(
+            days=days,
+            created=totals.get(db.EVENT_REQUEST_CREATED, 0),
+            approved=approved,
+            rejected=rejected,
+            approval_rate=round(100 * approved / moderated) if moderated else 0,
+            sent=totals.get(db.EVENT_BROADCAST_SENT, 0),
+            failed=totals.get(db.EVENT_BROADCAST_FAILED, 0),
+        ),
+        "",
+    ]
+    for pair in pairs.values():
+        lines.append(
+            texts.STATS_ITEM_TEMPLATE.format(
+                format_name=pair["format_name"],
+                limit_name=pair["limit_name"],
+                created=pair.get(db.EVENT_REQUEST_CREATED, 0),
+                approved=pair.get(db.EVENT_REQUEST_APPROVED, 0),
+                rejected=pair.get(db.EVENT_REQUEST_REJECTED, 0),
+                sent=pair.get(db.EVENT_BROADCAST_SENT, 0),
+            )
+        )
+    # One line per format/limit pair: a busy catalog needs several messages
+    for chunk in _chunk_lines(lines):
+        await message.answer(chunk, reply_markup=main_menu_kb)
+
+
+@router.message(Command("export"))
+async def cmd_export(message: Message) -> None:
+    if not await _ensure_admin(message):
+        return
+    await message.answer(texts.EXPORT_STARTED_TEXT, reply_markup=main_menu_kb)
+
+    fd, path = tempfile.mkstemp(prefix="players_", suffix=".csv.gz")
+    os.close(fd)
+    try:
+        count = await export_players_csv_gz(path)
+        filename = time.strftime("players_%Y%m%d_%H%M%S.csv.gz")
+        await message.answer_document(
+            FSInputFile(path, filename=filename),
+            caption=texts.EXPORT_DONE_TEXT.format(count=count),
+            reply_markup=main_menu_kb,
+        )
+    except Exception as e:  # noqa: BLE001
+        logger.exception("Failed to export players: %s", e)
+        await message.answer(texts.EXPORT_FAILED_TEXT, reply_markup=main_menu_kb)
+    finally:
+        os.remove(path)
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from typing import Coroutine, Dict, Optional, Set
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import CallbackQuery
+
+from bot import texts
+from bot.config import BACKGROUND_BROADCASTS_MAX, BACKGROUND_TASKS_MAX, BACKGROUND_TASKS_QUEUE_MAX
+from bot.keyboards import main_menu_kb
+
+
+logger = logging.getLogger(__name__)
+
+POOL_DEFAULT = "default"
+POOL_BROADCASTS = "broadcasts"
+_slots: Dict[str, asyncio.Semaphore] = {
+    POOL_DEFAULT: asyncio.Semaphore(BACKGROUND_TASKS_MAX),
+    POOL_BROADCASTS: asyncio.Semaphore(BACKGROUND_BROADCASTS_MAX),
+}
+# Strong references: the loop only keeps weak ones to running tasks
+_tasks: Set[asyncio.Task] = set()
+
+
+def pending_count() -> int:
+    return len(_tasks)
+
+
+async def _supervise(bot: Bot, chat_id: int, work: Coroutine, name: str, pool: str) -> None:
+    async with _slots[pool]:
+        try:
+            await work
+        except Exception as e:  # noqa: BLE001
+            logger.exception("Background task %s failed: %s", name, e)
+            try:
+                await bot.send_message(chat_id, texts.BACKGROUND_TASK_FAILED_TEXT, reply_markup=main_menu_kb)
+            except TelegramAPIError as send_error:
+                logger.warning("Could not report failure of %s to %s: %s", name, chat_id, send_error)
+
+
+def spawn(
+    bot: Bot, chat_id: int, work: Coroutine, name: str, pool: str = POOL_DEFAULT
+) -> Optional[asyncio.Task]:
+    """Run ``work`` in the background; failures are logged and reported to ``chat_id``.
+
+    ``pool`` picks the concurrency limit it waits for. Returns None (and
+    discards ``work``) if too many tasks are already pending.
+    """
+    if len(_tasks) >= BACKGROUND_TASKS_QUEUE_MAX:
+        logger.warning("Background queue full (%d), refusing %s", len(_tasks), name)
+        work.close()
+        return None
+    task = asyncio.create_task(_supervise(bot, chat_id, work, name, pool))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+async def ack_and_continue(
+    callback: CallbackQuery,
+    work: Coroutine,
+    text: Optional[str] = None,
+    show_alert: bool = False,
+) -> Optional[asyncio.Task]:
+    """Answer the callback right away, then run ``work`` in the background.
+
+    ``work`` must report its outcome with messages, the callback is already
+    answered. Returns None if the task was refused; the user is told so.
+    """
+    if len(_tasks) >= BACKGROUND_TASKS_QUEUE_MAX:
+        work.close()
+        await callback.answer(texts.BACKGROUND_BUSY_TEXT, show_alert=True)
+        return None
+    try:
+        await callback.answer(text, show_alert=show_alert)
+    except TelegramAPIError as e:
+        # Too old to answer; the work itself is still wanted
+        logger.warning("Could not answer callback %s: %s", callback.data, e)
+    return spawn(callback.bot, callback.message.chat.id, work, name=callback.data or "callback")
+
+
+async def wait_idle(timeout: float) -> None:
+    """Give pending tasks up to ``timeout`` seconds to finish (used on shutdown)."""
+    if not _tasks:
+        return
+    logger.info("Waiting for %d background task(s) to finish", len(_tasks))
+    _, still_running = await asyncio.wait(set(_tasks), timeout=timeout)
+    if still_running:
+        logger.warning("%d background task(s) did not finish in time", len(still_running))
@@ -1,14 +1,19 @@
 import logging
 import time
+from typing import Coroutine, Optional, Set, Tuple
 
-from aiogram import F, Router
+from aiogram import Bot, F, Router
 from aiogram.enums import ChatType
-from aiogram.types import CallbackQuery
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery, Message
 from aiogram.utils.markdown import hlink
 
 from bot import db, texts
-from bot.config import ADMIN_IDS, DEPOSIT_LINK
-from bot.keyboards import main_menu_kb, moderation_keyboard
+from bot.handlers import background
+from bot.config import BROADCAST_PROGRESS_EDIT_SECONDS
+from bot.keyboards import broadcast_cancel_keyboard, main_menu_kb, moderation_keyboard
+from bot.services import broadcaster, delivery
+from bot.storage import Format, Limit, Player, Request, Segment
 
 
 logger = logging.getLogger(__name__)
@@ -18,44 +23,44 @@ router.callback_query.filter(F.message.chat.type == ChatType.PRIVATE)
 
 
 def _is_admin(user_id: int) -> bool:
-    return user_id in ADMIN_IDS
+    return db.is_admin(user_id)
+
+
+def _admin_text(template: str, player: Player, fmt: Format, lim: Limit) -> str:
+    if player.username:
+        link = f"https://t.me/{player.username}"
+    else:
+        link = hlink("профиль", f"tg://user?id={player.tg_id}")
+
+    return template.format(
+        nick=texts.html_safe(player.nick or ""),
+        format=texts.html_safe(fmt.name),
+        limit=texts.html_safe(lim.name),
+        link=link,
+    )
 
 
 async def send_request_to_admins(bot, request_id: int) -> None:
     request = await db.get_request_by_id(request_id)
     if not request:
         return
-    player = await db.get_player_by_internal_id(int(request["player_id"]))
+    player = await db.get_player_by_internal_id(request.player_id)
     if not player:
         return
-    fmt = await db.get_format_by_id(int(request["format_id"]))
-    lim = await db.get_limit_by_id(int(request["limit_id"]))
+    fmt = await db.get_format_by_id(request.format_id)
+    lim = await db.get_limit_by_id(request.limit_id)
     if not fmt or not lim:
         return
 
-    nick_safe = texts.html_safe(player.get("nick") or "")
-    fmt_safe = texts.html_safe(fmt["name"])
-    lim_safe = texts.html_safe(lim["name"])
-
-    if player.get("username"):
-        link = f"https://t.me/{player['username']}"
-    else:
-        link = hlink("профиль", f"tg://user?id={player['tg_id']}")
+    text = _admin_text(texts.REQUEST_TO_ADMIN_TEMPLATE, player, fmt, lim)
+    kb = moderation_keyboard(request_id)
 
-    text = texts.REQUEST_TO_ADMIN_TEMPLATE.format(
-        nick=nick_safe,
-        format=fmt_safe,
-        limit=lim_safe,
-        link=link,
-    )
+    for admin_id in sorted(db.get_admin_ids()):
+        await delivery.send_message(bot, admin_id, text, reply_markup=kb)
 
-    kb = moderation_keyboard(request_id)
 
-    for admin_id in ADMIN_IDS:
-        try:
-            await bot.send_message(admin_id, text, reply_markup=kb)
-        except Exception as e:  # noqa: BLE001
-            logger.exception("Failed to send moderation request to admin %s: %s", admin_id, e)
+# request_ids whose moderation is running, so a double click cannot broadcast twice
+_processing: Set[int] = set()
 
 
 @router.callback_query(F.data.startswith("mod:"))
@@ -71,83 +76,246 @@ async def on_moderation_action(callback: CallbackQuery) -> None:
     except ValueError:
         await callback.answer("Некорректные данные.", show_alert=True)
         return
+    if action not in ("approve", "reject"):
+        await callback.answer("Неизвестное действие.", show_alert=True)
+        return
+    if request_id in _processing:
+        await callback.answer("Заявка уже обрабатывается.")
+        return
+
+    _processing.add(request_id)
+    task = await background.ack_and_continue(
+        callback, _moderate(callback, action, request_id), "Обрабатываю заявку..."
+    )
+    if task is None:
+        _processing.discard(request_id)
 
+
+@router.callback_query(F.data.startswith("bcancel:"))
+async def on_broadcast_cancel(callback: CallbackQuery) -> None:
+    if not _is_admin(callback.from_user.id):
+        await callback.answer("Нет прав для этого действия.", show_alert=True)
+        return
+    try:
+        progress_id = int((callback.data or "").split(":", maxsplit=1)[1])
+    except (IndexError, ValueError):
+        await callback.answer("Некорректные данные.", show_alert=True)
+        return
+
+    progress = broadcaster.get_running(progress_id)
+    if progress is None:
+        await callback.answer("Рассылка уже завершена.")
+        return
+    progress.cancel()
+    logger.info("Broadcast %s cancelled by admin %s", progress_id, callback.from_user.id)
+    await callback.answer("Останавливаю рассылку...")
+
+
+async def _moderate(callback: CallbackQuery, action: str, request_id: int) -> None:
+    try:
+        await _apply_moderation(callback, action, request_id)
+    finally:
+        _processing.discard(request_id)
+
+
+async def _load_request(
+    request_id: int,
+) -> Tuple[Optional[Tuple[Request, Player, Format, Limit]], str]:
+    """(request, player, format, limit) or None and the reason, for the moderator."""
     request = await db.get_request_by_id(request_id)
     if not request:
-        await callback.answer("Заявка не найдена.", show_alert=True)
-        return
+        return None, "Заявка не найдена."
 
-    player = await db.get_player_by_internal_id(int(request["player_id"]))
-    fmt = await db.get_format_by_id(int(request["format_id"]))
-    lim = await db.get_limit_by_id(int(request["limit_id"]))
+    player = await db.get_player_by_internal_id(request.player_id)
+    fmt = await db.get_format_by_id(request.format_id)
+    lim = await db.get_limit_by_id(request.limit_id)
     if not player or not fmt or not lim:
-        await callback.answer("Ошибка данных заявки.", show_alert=True)
         await db.delete_request(request_id)
-        return
+        return None, "Ошибка данных заявки."
+    return (request, player, fmt, lim), ""
 
-    nick_safe = texts.html_safe(player.get("nick") or "")
-    fmt_safe = texts.html_safe(fmt["name"])
-    lim_safe = texts.html_safe(lim["name"])
 
-    if action == "approve":
-        logger.info("Approving request_id=%s, format_id=%s, limit_id=%s", request_id, request["format_id"], request["limit_id"])
-        segment = await db.get_segment_by_pair(int(request["format_id"]), int(request["limit_id"]))
-        if not segment:
-            logger.warning("Segment not found for format_id=%s, limit_id=%s", request["format_id"], request["limit_id"])
-            await callback.message.answer(
-                "Сегмент для этого формата и лимита не найден. Создайте его через /segment.",
-                reply_markup=main_menu_kb,
+class _ProgressCard:
+    """Message showing a broadcast's progress, edited at most every BROADCAST_PROGRESS_EDIT_SECONDS."""
+
+    def __init__(self, bot: Bot, chat_id: int) -> None:
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message: Optional[Message] = None
+        self._edited_at = float("-inf")
+
+    @staticmethod
+    def _text(progress: broadcaster.BroadcastProgress, final: bool) -> str:
+        if final and progress.cancelled.is_set():
+            return texts.BROADCAST_CANCELLED_TEMPLATE.format(
+                sent=progress.sent,
+                total=progress.total,
+                failed=progress.failed,
+                remaining=progress.remaining + progress.queued,
             )
-            await callback.answer()
-            await db.delete_request(request_id)
+        if final:
+            return texts.BROADCAST_DONE_TEMPLATE.format(
+                sent=progress.sent, total=progress.total, failed=progress.failed, queued=progress.queued
+            )
+        eta = progress.eta_seconds()
+        return texts.BROADCAST_PROGRESS_TEMPLATE.format(
+            sent=progress.sent,
+            total=progress.total,
+            failed=progress.failed,
+            queued=progress.queued,
+            remaining=progress.remaining,
+            eta="—" if eta is None else f"{int(eta) // 60} мин {int(eta) % 60} с",
+        )
+
+    async def __call__(self, progress: broadcaster.BroadcastProgress, final: bool) -> None:
+        now = time.monotonic()
+        if not final and now - self._edited_at < BROADCAST_PROGRESS_EDIT_SECONDS:
+            return
+        self._edited_at = now
+        text = self._text(progress, final)
+        kb = None if final else broadcast_cancel_keyboard(progress.id)
+        if self.message is None:
+            self.message = await self.bot.send_message(self.chat_id, text, reply_markup=kb)
             return
+        try:
+            await self.message.edit_text(text, reply_markup=kb)
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                raise
+
+
+class Approval:
+    """An approved request, ready to be broadcast."""
+
+    __slots__ = ("segment", "player", "fmt", "lim")
+
+    def __init__(self, segment: Segment, player: Player, fmt: Format, lim: Limit) -> None:
+        self.segment = segment
+        self.player = player
+        self.fmt = fmt
+        self.lim = lim
+
+
+async def accept_request(bot: Bot, request_id: int, auto: bool = False) -> Tuple[Optional[Approval], str]:
+    """Approve the request if it can be broadcast: record it and delete it.
 
-        segment_id = int(segment["id"])
-        logger.info("Found segment_id=%s, getting players...", segment_id)
-        players = await db.get_players_for_segment(segment_id, exclude_player_id=int(player["internal_id"]))
-        logger.info("Found %d players in segment %s (excluding creator internal_id=%s)", len(players), segment_id, player["internal_id"])
+    Used by admins and, with ``auto``, by auto-approval: then a request that
+    cannot be broadcast stays pending for the admins, and they get a notice
+    that it was approved. Returns the approval, or None and the reason for
+    the moderator.
+    """
+    loaded, error = await _load_request(request_id)
+    if not loaded:
+        return None, error
+    request, player, fmt, lim = loaded
 
-        if not players:
-            logger.warning("No players found in segment %s (excluding creator)", segment_id)
-            await callback.answer("В этом сегменте нет других игроков для рассылки.", show_alert=True)
+    logger.info("Approving request_id=%s, format_id=%s, limit_id=%s", request_id, request.format_id, request.limit_id)
+    segment = await db.get_segment_by_pair(request.format_id, request.limit_id)
+    if not segment:
+        logger.warning("Segment not found for format_id=%s, limit_id=%s", request.format_id, request.limit_id)
+        if not auto:
             await db.delete_request(request_id)
-            return
+        return None, "Сегмент для этого формата и лимита не найден. Создайте его через /segment."
 
-        text = texts.BROADCAST_TEMPLATE.format(
-            nick=nick_safe,
-            format=fmt_safe,
-            limit=lim_safe,
-            deposit_link=DEPOSIT_LINK,
-        )
+    segment_id = segment.id
+    audience_size = await db.count_segment_audience(segment_id, exclude_tg_id=player.tg_id)
+    logger.info("Found %d recipients in segment %s (excluding creator internal_id=%s)", audience_size, segment_id, player.internal_id)
 
-        delete_at = int(time.time()) + 6 * 60 * 60
-        sent_count = 0
-        bot = callback.bot
-        for p in players:
-            try:
-                logger.info("Sending broadcast to tg_id=%s (internal_id=%s)", p.get("tg_id"), p.get("internal_id"))
-                msg = await bot.send_message(p["tg_id"], text)
-                await db.schedule_deletion(msg.chat.id, msg.message_id, delete_at)
-                sent_count += 1
-            except Exception as e:  # noqa: BLE001
-                logger.exception("Failed to send broadcast to %s: %s", p.get("tg_id"), e)
-
-        logger.info("Broadcast completed: sent %d/%d messages", sent_count, len(players))
-        await db.delete_request(request_id)
-        await callback.answer("Заявка одобрена.")
+    if not audience_size:
+        logger.warning("No players found in segment %s (excluding creator)", segment_id)
+        if not auto:
+            await db.delete_request(request_id)
+        return None, "В этом сегменте нет других игроков для рассылки."
 
-    elif action == "reject":
-        delete_at = int(time.time()) + 60 * 60
-        bot = callback.bot
-        try:
-            msg = await bot.send_message(player["tg_id"], texts.REJECT_PLAYER_TEXT)
-            await db.schedule_deletion(msg.chat.id, msg.message_id, delete_at)
-        except Exception as e:  # noqa: BLE001
-            logger.exception("Failed to send rejection to %s: %s", player.get("tg_id"), e)
+    await db.record_event(
+        db.EVENT_REQUEST_APPROVED,
+        request.format_id,
+        request.limit_id,
+        player.internal_id,
+    )
+    # Deleted before the (possibly long) broadcast so a late click finds nothing to approve
+    await db.delete_request(request_id)
+    if auto:
+        notice = _admin_text(texts.REQUEST_AUTO_APPROVED_TO_ADMIN_TEMPLATE, player, fmt, lim)
+        for admin_id in sorted(db.get_admin_ids()):
+            await delivery.send_message(bot, admin_id, notice)
+    return Approval(segment, player, fmt, lim), ""
 
-        await db.delete_request(request_id)
-        await callback.answer("Заявка отклонена.")
 
-    else:
-        await callback.answer("Неизвестное действие.", show_alert=True)
+async def broadcast_approval(bot: Bot, approval: Approval, progress_chat_id: Optional[int] = None) -> str:
+    """Broadcast an approved request to its segment; returns the outcome for the moderator.
+
+    With ``progress_chat_id`` a progress card with a cancel button is posted
+    there while the broadcast runs.
+    """
+    player = approval.player
+    progress = broadcaster.BroadcastProgress(
+        _ProgressCard(bot, progress_chat_id) if progress_chat_id is not None else None
+    )
+    coalesced = await broadcaster.broadcast_request(
+        bot,
+        approval.segment,
+        player.tg_id,
+        texts.html_safe(player.nick or ""),
+        texts.html_safe(approval.fmt.name),
+        texts.html_safe(approval.lim.name),
+        progress,
+    )
+    if coalesced:
+        return "Заявка одобрена, рассылка уйдёт общей сводкой по сегменту."
+    if progress.cancelled.is_set():
+        return "Заявка одобрена, рассылка остановлена."
+    return "Заявка одобрена, рассылка завершена."
+
+
+async def _broadcast_and_report(bot: Bot, chat_id: int, approval: Approval) -> None:
+    outcome = await broadcast_approval(bot, approval, chat_id)
+    await bot.send_message(chat_id, outcome, reply_markup=main_menu_kb)
+
+
+async def start_broadcast(bot: Bot, chat_id: int, approval: Approval, report: bool = False) -> None:
+    """Broadcast ``approval`` in the broadcasts pool; failures are reported to ``chat_id``.
+
+    With ``report`` the progress card and the outcome go to ``chat_id`` too.
+    If the background queue is full the broadcast runs right here instead:
+    the request is already deleted, so refusing it would lose the announcement.
+    """
+    def work() -> Coroutine:
+        if report:
+            return _broadcast_and_report(bot, chat_id, approval)
+        return broadcast_approval(bot, approval)
+
+    name = f"broadcast:{approval.segment.id}:{approval.player.internal_id}"
+    if background.spawn(bot, chat_id, work(), name, background.POOL_BROADCASTS) is None:
+        await work()
+
+
+async def _apply_moderation(callback: CallbackQuery, action: str, request_id: int) -> None:
+    reply = callback.message.answer
+    if action == "approve":
+        approval, error = await accept_request(callback.bot, request_id)
+        if approval is None:
+            await reply(error, reply_markup=main_menu_kb)
+            return
+        await start_broadcast(callback.bot, callback.message.chat.id, approval, report=True)
+        return
+
+    loaded, error = await _load_request(request_id)
+    if not loaded:
+        await reply(error, reply_markup=main_menu_kb)
+        return
+    request, player, _, _ = loaded
+
+    await db.record_event(
+        db.EVENT_REQUEST_REJECTED,
+        request.format_id,
+        request.limit_id,
+        player.internal_id,
+    )
+    delete_at = int(time.time()) + 60 * 60
+    await delivery.send_message(
+        callback.bot, player.tg_id, texts.REJECT_PLAYER_TEXT, delete_at=delete_at
+    )
 
+    await db.delete_request(request_id)
+    await reply("Заявка отклонена.", reply_markup=main_menu_kb)
@@ -1,13 +1,15 @@
 import logging
-from typing import Optional
+from typing import Optional, Set, Tuple
 
 from aiogram import F, Router
 from aiogram.enums import ChatType
 from aiogram.filters import Command, CommandStart
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, Message
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
 
 from bot import db, texts
+from bot.config import CATALOG_PAGE_SIZE, REQUEST_BUCKET_CAPACITY, REQUEST_BUCKET_REFILL_SECONDS
 from bot.keyboards import (
     MAIN_MENU_BUTTON_HELP,
     MAIN_MENU_BUTTON_START,
@@ -18,7 +20,11 @@ from bot.keyboards import (
     main_menu_kb,
 )
 from bot.states import UserStates
+from bot.handlers import background
 from bot.handlers import moderation as moderation_module
+from bot.services import auto_approval
+from bot.services.throttling import TokenBucketLimiter
+from bot.storage import Player
 
 
 logger = logging.getLogger(__name__)
@@ -27,6 +33,10 @@ router = Router(name="user")
 router.message.filter(F.chat.type == ChatType.PRIVATE)
 router.callback_query.filter(F.message.chat.type == ChatType.PRIVATE)
 
+request_limiter = TokenBucketLimiter(REQUEST_BUCKET_CAPACITY, REQUEST_BUCKET_REFILL_SECONDS)
+# (tg_id, format_id, limit_id) of submissions currently between the checks and create_request
+_submitting: Set[Tuple[int, int, int]] = set()
+
 
 async def _is_banned(tg_id: int) -> bool:
     return await db.is_banned_by_tg_id(tg_id)
@@ -45,23 +55,23 @@ async def _ask_nick(message: Message, state: FSMContext) -> None:
 
 
 async def _ask_format(message: Message, state: FSMContext) -> None:
-    formats = await db.get_all_formats()
+    formats, page, page_count = await db.get_formats_page(0, CATALOG_PAGE_SIZE)
     if not formats:
         await message.answer(texts.NO_FORMATS_TEXT, reply_markup=main_menu_kb)
         await state.clear()
         return
-    kb = formats_keyboard(formats)
+    kb = formats_keyboard(formats, page, page_count)
     await state.set_state(UserStates.CHOOSE_FORMAT)
     await message.answer(texts.QUESTION_FORMAT, reply_markup=kb)
 
 
 async def _ask_limit(message: Message, state: FSMContext, format_id: int) -> None:
-    limits = await db.get_limits_for_format(format_id)
+    limits, page, page_count = await db.get_limits_page(format_id, 0, CATALOG_PAGE_SIZE)
     if not limits:
         await message.answer(texts.NO_LIMITS_TEXT, reply_markup=main_menu_kb)
         await state.clear()
         return
-    kb = limits_keyboard(limits)
+    kb = limits_keyboard(limits, format_id, page, page_count)
     await state.set_state(UserStates.CHOOSE_LIMIT)
     await message.answer(texts.QUESTION_LIMIT, reply_markup=kb)
 
@@ -75,19 +85,22 @@ async def _show_confirmation(
         await message.answer("Произошла ошибка при получении формата или лимита.", reply_markup=main_menu_kb)
         await state.clear()
         return
-    fmt_name = texts.html_safe(fmt["name"])
-    lim_name = texts.html_safe(lim["name"])
+    fmt_name = texts.html_safe(fmt.name)
+    lim_name = texts.html_safe(lim.name)
     text = texts.CONFIRM_TEMPLATE.format(format=fmt_name, limit=lim_name)
     await state.set_state(UserStates.CONFIRM)
     await message.answer(text, reply_markup=confirm_keyboard())
 
 
-async def _get_or_create_player(message: Message) -> dict:
+async def _get_or_create_player(message: Message) -> Player:
     user = message.from_user
     player = await db.get_or_create_player(user.id, user.username)
     # Keep username up to date
-    if user.username and player.get("username") != user.username:
+    if user.username and player.username != user.username:
         await db.update_player_username(user.id, user.username)
+    # Writing to the bot again means they can be reached again
+    if player.is_unreachable:
+        await db.set_player_unreachable(user.id, False)
     return player
 
 
@@ -98,7 +111,7 @@ async def cmd_start(message: Message, state: FSMContext) -> None:
 
     player = await _get_or_create_player(message)
 
-    if not player.get("nick"):
+    if not player.nick:
         await _ask_nick(message, state)
     else:
         await message.answer(texts.ALREADY_REGISTERED, reply_markup=main_menu_kb)
@@ -112,7 +125,7 @@ async def on_main_menu(message: Message, state: FSMContext) -> None:
 
     await state.clear()
     player = await _get_or_create_player(message)
-    if not player.get("nick"):
+    if not player.nick:
         await _ask_nick(message, state)
     else:
         await _ask_format(message, state)
@@ -139,20 +152,52 @@ async def on_nick(message: Message, state: FSMContext) -> None:
 
     nick = message.text.strip()
     player = await _get_or_create_player(message)
-    internal_id = player["internal_id"]
-    await db.set_player_nick(internal_id, nick)
+    await db.set_player_nick(player.internal_id, nick)
 
     await _ask_format(message, state)
 
 
-@router.callback_query(F.data.startswith("fmt:"))
-async def on_format_chosen(callback: CallbackQuery, state: FSMContext) -> None:
-    if await _is_banned(callback.from_user.id):
-        await callback.message.answer(texts.BANNED_TEXT, reply_markup=main_menu_kb)
-        await callback.answer()
-        await state.clear()
+@router.callback_query(F.data == "noop")
+async def on_noop(callback: CallbackQuery) -> None:
+    # Page counter buttons
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("fmtp:"))
+async def on_formats_page(callback: CallbackQuery) -> None:
+    try:
+        page = int((callback.data or "").split(":", maxsplit=1)[1])
+    except (IndexError, ValueError):
+        await callback.answer("Некорректный формат данных.", show_alert=True)
         return
+    await callback.answer()
+    formats, page, page_count = await db.get_formats_page(page, CATALOG_PAGE_SIZE)
+    await _edit_keyboard(callback, formats_keyboard(formats, page, page_count))
 
+
+@router.callback_query(F.data.startswith("limp:"))
+async def on_limits_page(callback: CallbackQuery) -> None:
+    try:
+        _, format_id_str, page_str = (callback.data or "").split(":", maxsplit=2)
+        format_id, page = int(format_id_str), int(page_str)
+    except ValueError:
+        await callback.answer("Некорректный формат данных.", show_alert=True)
+        return
+    await callback.answer()
+    limits, page, page_count = await db.get_limits_page(format_id, page, CATALOG_PAGE_SIZE)
+    await _edit_keyboard(callback, limits_keyboard(limits, format_id, page, page_count))
+
+
+async def _edit_keyboard(callback: CallbackQuery, kb: InlineKeyboardMarkup) -> None:
+    try:
+        await callback.message.edit_reply_markup(reply_markup=kb)
+    except TelegramBadRequest:
+        # "message is not modified" after a double click
+        pass
+
+
+@router.callback_query(F.data.startswith("fmt:"))
+async def on_format_chosen(callback: CallbackQuery, state: FSMContext) -> None:
     data = callback.data or ""
     try:
         _, fmt_id_str = data.split(":", maxsplit=1)
@@ -161,19 +206,19 @@ async def on_format_chosen(callback: CallbackQuery, state: FSMContext) -> None:
         await callback.answer("Некорректный формат данных.", show_alert=True)
         return
 
-    await state.update_data(format_id=format_id)
+    # Stop the client spinner before any database work
     await callback.answer()
-    await _ask_limit(callback.message, state, format_id)
-
-
-@router.callback_query(F.data.startswith("lim:"))
-async def on_limit_chosen(callback: CallbackQuery, state: FSMContext) -> None:
     if await _is_banned(callback.from_user.id):
         await callback.message.answer(texts.BANNED_TEXT, reply_markup=main_menu_kb)
-        await callback.answer()
         await state.clear()
         return
 
+    await state.update_data(format_id=format_id)
+    await _ask_limit(callback.message, state, format_id)
+
+
+@router.callback_query(F.data.startswith("lim:"))
+async def on_limit_chosen(callback: CallbackQuery, state: FSMContext) -> None:
     data = callback.data or ""
     try:
         _, lim_id_str = data.split(":", maxsplit=1)
@@ -182,60 +227,115 @@ async def on_limit_chosen(callback: CallbackQuery, state: FSMContext) -> None:
         await callback.answer("Некорректный формат данных.", show_alert=True)
         return
 
+    await callback.answer()
+    if await _is_banned(callback.from_user.id):
+        await callback.message.answer(texts.BANNED_TEXT, reply_markup=main_menu_kb)
+        await state.clear()
+        return
+
     fsm_data = await state.get_data()
     format_id = fsm_data.get("format_id")
     if not format_id:
         await callback.message.answer("Не выбран формат. Начните сначала.", reply_markup=main_menu_kb)
         await state.clear()
-        await callback.answer()
         return
 
     await state.update_data(limit_id=limit_id)
-    await callback.answer()
     await _show_confirmation(callback.message, state, format_id, limit_id)
 
 
 @router.callback_query(F.data == "confirm:no")
 async def on_confirm_no(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.answer()
     if await _is_banned(callback.from_user.id):
         await callback.message.answer(texts.BANNED_TEXT, reply_markup=main_menu_kb)
-        await callback.answer()
         await state.clear()
         return
 
     await state.clear()
-    await callback.answer()
     await _ask_format(callback.message, state)
 
 
 @router.callback_query(F.data == "confirm:yes")
 async def on_confirm_yes(callback: CallbackQuery, state: FSMContext) -> None:
-    if await _is_banned(callback.from_user.id):
-        await callback.message.answer(texts.BANNED_TEXT, reply_markup=main_menu_kb)
-        await callback.answer()
-        await state.clear()
-        return
-
     fsm_data = await state.get_data()
     format_id: Optional[int] = fsm_data.get("format_id")
     limit_id: Optional[int] = fsm_data.get("limit_id")
     if not format_id or not limit_id:
+        await callback.answer()
         await callback.message.answer("Не выбран формат или лимит. Начните сначала.", reply_markup=main_menu_kb)
         await state.clear()
-        await callback.answer()
         return
 
-    player = await db.get_or_create_player(
-        callback.from_user.id,
-        callback.from_user.username,
-    )
-    player_id = int(player["internal_id"])
+    tg_id = callback.from_user.id
+    key = (tg_id, format_id, limit_id)
+    if key in _submitting:
+        await callback.answer(texts.REQUEST_ALREADY_PENDING_TEXT)
+        return
+    if not request_limiter.consume(tg_id):
+        await callback.answer(texts.REQUEST_RATE_LIMITED_TEXT, show_alert=True)
+        return
 
-    request_id = await db.create_request(player_id, format_id, limit_id)
+    _submitting.add(key)
+    task = await background.ack_and_continue(callback, _submit_request(callback, state, key))
+    if task is None:
+        _submitting.discard(key)
+        request_limiter.refund(tg_id)
 
-    await moderation_module.send_request_to_admins(callback.bot, request_id)
 
-    await callback.answer("Ваш запрос отправлен на модерацию.")
+async def _submit_request(callback: CallbackQuery, state: FSMContext, key: Tuple[int, int, int]) -> None:
+    tg_id, format_id, limit_id = key
+    try:
+        if await _is_banned(tg_id):
+            request_limiter.refund(tg_id)
+            await state.clear()
+            await callback.message.answer(texts.BANNED_TEXT, reply_markup=main_menu_kb)
+            return
+
+        player = await db.get_or_create_player(tg_id, callback.from_user.username)
+        player_id = player.internal_id
+
+        if await db.get_pending_request(player_id, format_id, limit_id):
+            request_limiter.refund(tg_id)
+            await state.clear()
+            await callback.message.answer(texts.REQUEST_ALREADY_PENDING_TEXT, reply_markup=main_menu_kb)
+            return
+
+        request_id = await db.create_request(player_id, format_id, limit_id)
+    finally:
+        _submitting.discard(key)
+
     await state.clear()
-    await callback.message.answer("Ваша заявка отправлена на модерацию.", reply_markup=main_menu_kb)
+    if await _try_auto_approve(callback, player, format_id, limit_id, request_id):
+        return
+    await callback.message.answer(texts.REQUEST_SENT_TEXT, reply_markup=main_menu_kb)
+    await moderation_module.send_request_to_admins(callback.bot, request_id)
 
+
+async def _try_auto_approve(
+    callback: CallbackQuery,
+    player: Player,
+    format_id: int,
+    limit_id: int,
+    request_id: int,
+) -> bool:
+    """Approve right away if the auto-approval rules allow it.
+
+    The player is answered as soon as the request is approved; the broadcast
+    runs as its own background task. False leaves the request pending, to be
+    sent to the admins as usual.
+    """
+    if not auto_approval.is_enabled():
+        return False
+    segment = await db.get_segment_by_pair(format_id, limit_id)
+    if not segment or not auto_approval.should_auto_approve(player, segment.id):
+        return False
+
+    logger.info("Auto-approving request_id=%s of player internal_id=%s", request_id, player.internal_id)
+    approval, error = await moderation_module.accept_request(callback.bot, request_id, auto=True)
+    if approval is None:
+        logger.info("Auto-approval of request_id=%s failed (%s), sending it to the admins", request_id, error)
+        return False
+    await callback.message.answer(texts.REQUEST_AUTO_APPROVED_TEXT, reply_markup=main_menu_kb)
+    await moderation_module.start_broadcast(callback.bot, callback.message.chat.id, approval)
+    return True
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from aiogram.types import (
     InlineKeyboardButton,
     InlineKeyboardMarkup,
@@ -5,6 +7,7 @@ from aiogram.types import (
     ReplyKeyboardMarkup,
 )
 
+from bot.storage import Format, Limit
 from bot.texts import CONFIRM_NO, CONFIRM_YES, HELP_TEXT
 
 
@@ -23,22 +26,55 @@ main_menu_kb = ReplyKeyboardMarkup(
 )
 
 
-def formats_keyboard(formats: list[dict]) -> InlineKeyboardMarkup:
+def pager_row(prefix: str, page: int, page_count: int) -> list[InlineKeyboardButton]:
+    """Prev/next buttons with a page counter; callbacks are ``{prefix}:{page}``."""
+    row = []
+    if page > 0:
+        row.append(InlineKeyboardButton(text="◀", callback_data=f"{prefix}:{page - 1}"))
+    row.append(InlineKeyboardButton(text=f"{page + 1}/{page_count}", callback_data="noop"))
+    if page < page_count - 1:
+        row.append(InlineKeyboardButton(text="▶", callback_data=f"{prefix}:{page + 1}"))
+    return row
+
+
+def formats_keyboard(formats: list[Format], page: int = 0, page_count: int = 1) -> InlineKeyboardMarkup:
     buttons = [
-        [InlineKeyboardButton(text=item["name"], callback_data=f"fmt:{item['id']}")]
+        [InlineKeyboardButton(text=item.name, callback_data=f"fmt:{item.id}")]
         for item in formats
     ]
+    if page_count > 1:
+        buttons.append(pager_row("fmtp", page, page_count))
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
-def limits_keyboard(limits: list[dict]) -> InlineKeyboardMarkup:
+def limits_keyboard(
+    limits: list[Limit], format_id: int, page: int = 0, page_count: int = 1
+) -> InlineKeyboardMarkup:
     buttons = [
-        [InlineKeyboardButton(text=item["name"], callback_data=f"lim:{item['id']}")]
+        [InlineKeyboardButton(text=item.name, callback_data=f"lim:{item.id}")]
         for item in limits
     ]
+    if page_count > 1:
+        buttons.append(pager_row(f"limp:{format_id}", page, page_count))
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+def segments_page_keyboard(page: int, page_count: int) -> Optional[InlineKeyboardMarkup]:
+    if page_count <= 1:
+        return None
+    return InlineKeyboardMarkup(inline_keyboard=[pager_row("segp", page, page_count)])
+
+
+def find_results_keyboard(query: str, page: int, has_next: bool) -> Optional[InlineKeyboardMarkup]:
+    # No total count (too slow for broad prefixes), so only prev/next
+    row = []
+    if page > 0:
+        row.append(InlineKeyboardButton(text="◀", callback_data=f"find:{page - 1}:{query}"))
+    if has_next:
+        row.append(InlineKeyboardButton(text="▶", callback_data=f"find:{page + 1}:{query}"))
+    return InlineKeyboardMarkup(inline_keyboard=[row]) if row else None
+
+
 def confirm_keyboard() -> InlineKeyboardMarkup:
     buttons = [
         [
@@ -63,6 +99,13 @@ def moderation_keyboard(request_id: int) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+def broadcast_cancel_keyboard(progress_id: int) -> InlineKeyboardMarkup:
+    buttons = [
+        [InlineKeyboardButton(text="⛔ Остановить рассылку", callback_data=f"bcancel:{progress_id}")]
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
 def help_inline_keyboard() -> InlineKeyboardMarkup:
     buttons = [
         [
@@ -0,0 +1,21 @@
+from .concurrency import (
+    ConcurrencyLimiter,
+    ConcurrencyMiddleware,
+    global_concurrency_limit,
+    limiters,
+    router_concurrency_limit,
+)
+from .recording import RecordingMiddleware, UpdateAnonymizer
+from .throttling import FloodControlMiddleware, flood_control
+
+__all__ = [
+    "ConcurrencyLimiter",
+    "ConcurrencyMiddleware",
+    "FloodControlMiddleware",
+    "flood_control",
+    "global_concurrency_limit",
+    "limiters",
+    "RecordingMiddleware",
+    "router_concurrency_limit",
+    "UpdateAnonymizer",
+]
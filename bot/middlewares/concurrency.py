@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message, TelegramObject, Update, User
+
+from bot import db
+from bot.config import (
+    ROUTER_CONCURRENCY,
+    UPDATE_CONCURRENCY_MAX,
+    UPDATE_QUEUE_MAX,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Wait times kept for the percentiles in stats()
+_WAIT_SAMPLES = 1000
+
+
+class ConcurrencyLimiter:
+    """At most ``limit`` holders at once, FIFO queue for the rest.
+
+    Once ``max_queue`` callers are waiting, low-priority callers are refused
+    instead of queued; others still wait.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int) -> None:
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.admitted_total = 0
+        self.shed_total = 0
+        self._waits: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+
+    async def acquire(self, low_priority: bool) -> bool:
+        if self._semaphore.locked() and low_priority and self.waiting >= self.max_queue:
+            self.shed_total += 1
+            return False
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        started = time.monotonic()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self._waits.append(time.monotonic() - started)
+        self.in_flight += 1
+        self.admitted_total += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "admitted_total": self.admitted_total,
+            "shed_total": self.shed_total,
+            "wait_p50_ms": waits[len(waits) // 2] * 1000 if waits else 0.0,
+            "wait_p95_ms": waits[int(len(waits) * 0.95)] * 1000 if waits else 0.0,
+            "wait_max_ms": waits[-1] * 1000 if waits else 0.0,
+        }
+
+
+def _is_low_priority(event: TelegramObject, user: User) -> bool:
+    # New messages from players can be dropped under overload; button presses
+    # continue a flow already in progress, and admins are never shed
+    if user is None or db.is_admin(user.id):
+        return False
+    if isinstance(event, Update):
+        return event.message is not None
+    return isinstance(event, Message)
+
+
+class ConcurrencyMiddleware(BaseMiddleware):
+    """Runs handlers under a ConcurrencyLimiter, shedding low-priority updates."""
+
+    def __init__(self, limiter: ConcurrencyLimiter) -> None:
+        self.limiter = limiter
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not await self.limiter.acquire(_is_low_priority(event, data.get("event_from_user"))):
+            logger.warning("Shedding update: %s queue is full (%d waiting)", self.limiter.name, self.limiter.waiting)
+            return None
+        try:
+            return await handler(event, data)
+        finally:
+            self.limiter.release()
+
+
+# name -> limiter, for the metrics command
+limiters: Dict[str, ConcurrencyLimiter] = {}
+
+
+def concurrency_limit(name: str, limit: int, max_queue: int) -> ConcurrencyMiddleware:
+    limiter = ConcurrencyLimiter(name, limit, max_queue)
+    limiters[name] = limiter
+    return ConcurrencyMiddleware(limiter)
+
+
+def global_concurrency_limit() -> ConcurrencyMiddleware:
+    return concurrency_limit("global", UPDATE_CONCURRENCY_MAX, UPDATE_QUEUE_MAX)
+
+
+def router_concurrency_limit(router_name: str) -> ConcurrencyMiddleware:
+    limit, max_queue = ROUTER_CONCURRENCY[router_name]
+    return concurrency_limit(router_name, limit, max_queue)
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from bot import db
+
+
+logger = logging.getLogger(__name__)
+
+# Objects describing a person or chat; their identifying fields are replaced
+_PERSON_KEYS = frozenset(
+    ("from", "from_user", "chat", "user", "sender_chat", "forward_from", "forward_from_chat")
+)
+_NAME_FIELDS = ("first_name", "last_name", "title")
+# Free text that may quote people: user links (the moderation cards carry
+# them), ids given as admin command arguments
+_TEXT_KEYS = frozenset(("text", "caption", "url"))
+_USER_LINK = re.compile(r"(tg://user\?id=)(-?\d+)")
+_TME_LINK = re.compile(r"(t\.me/)(\w+)")
+_COMMAND_ARG_ID = re.compile(r"(?<=\s)-?\d+\b")
+# The bot's own message under a button press (a moderation card, for one);
+# handlers only need its chat and id
+_BOT_MESSAGE_FIELDS = ("text", "entities", "caption", "caption_entities")
+
+# Flush buffered lines at least this often
+_FLUSH_SECONDS = 1.0
+
+
+class UpdateAnonymizer:
+    """Replaces user/chat ids and names with stable pseudonyms.
+
+    The same id always maps to the same pseudonym within one recording (so
+    per-user flows replay correctly), but the salt is random per process.
+    """
+
+    def __init__(self, salt: Optional[bytes] = None) -> None:
+        self.salt = salt if salt is not None else os.urandom(16)
+
+    def _digest(self, value: Any) -> str:
+        return hashlib.sha256(self.salt + str(value).encode("utf-8")).hexdigest()
+
+    def pseudonym_id(self, value: int) -> int:
+        pseudonym = 10**9 + int(self._digest(value)[:12], 16) % (9 * 10**9)
+        return -pseudonym if value < 0 else pseudonym
+
+    def pseudonym_username(self, value: str) -> str:
+        return "u" + self._digest(value)[:10]
+
+    def scrub_text(self, text: str) -> str:
+        text = _USER_LINK.sub(lambda m: m.group(1) + str(self.pseudonym_id(int(m.group(2)))), text)
+        text = _TME_LINK.sub(lambda m: m.group(1) + self.pseudonym_username(m.group(2)), text)
+        if text.startswith("/"):
+            text = _COMMAND_ARG_ID.sub(lambda m: str(self.pseudonym_id(int(m.group()))), text)
+        return text
+
+    def _person(self, obj: Dict[str, Any]) -> None:
+        if isinstance(obj.get("id"), int):
+            obj["id"] = self.pseudonym_id(obj["id"])
+        if obj.get("username"):
+            obj["username"] = self.pseudonym_username(obj["username"])
+        for field in _NAME_FIELDS:
+            if obj.get(field):
+                obj[field] = field
+
+    def anonymize(self, value: Any) -> Any:
+        """Anonymize a JSON-like update dict in place; returns it for convenience."""
+        if isinstance(value, dict):
+            message = value.get("callback_query", {}).get("message")
+            if isinstance(message, dict):
+                for field in _BOT_MESSAGE_FIELDS:
+                    message.pop(field, None)
+            for key, item in value.items():
+                if key in _PERSON_KEYS and isinstance(item, dict):
+                    self._person(item)
+                elif key in _TEXT_KEYS and isinstance(item, str):
+                    value[key] = self.scrub_text(item)
+                    continue
+                self.anonymize(item)
+        elif isinstance(value, list):
+            for item in value:
+                self.anonymize(item)
+        return value
+
+
+class RecordingMiddleware(BaseMiddleware):
+    """Outer update middleware appending anonymized raw updates to a JSONL file.
+
+    Each line is ``{"t": unix_time, "admin": bool, "update": {...}}``; the
+    admin flag lets the replay tool grant admin rights to the pseudonymous id.
+    """
+
+    def __init__(self, path: str, anonymizer: Optional[UpdateAnonymizer] = None) -> None:
+        self.path = path
+        self.anonymizer = anonymizer or UpdateAnonymizer()
+        self._file = open(path, "a", encoding="utf-8")
+        self._flushed_at = time.monotonic()
+        self.recorded_total = 0
+
+    def close(self) -> None:
+        self._file.close()
+
+    def _record(self, update: Update, admin: bool) -> None:
+        raw = update.model_dump(mode="json", by_alias=True, exclude_none=True)
+        line = {"t": time.time(), "admin": admin, "update": self.anonymizer.anonymize(raw)}
+        self._file.write(json.dumps(line, ensure_ascii=False) + "\n")
+        self.recorded_total += 1
+        now = time.monotonic()
+        if now - self._flushed_at >= _FLUSH_SECONDS:
+            self._file.flush()
+            self._flushed_at = now
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if isinstance(event, Update):
+            user = data.get("event_from_user")
+            try:
+                self._record(event, user is not None and db.is_admin(user.id))
+            except Exception as e:  # noqa: BLE001
+                # Recording must never break update handling
+                logger.warning("Failed to record update %s: %s", event.update_id, e)
+        return await handler(event, data)
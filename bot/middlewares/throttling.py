@@ -0,0 +1,58 @@
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+
+from bot import db
+from bot.config import (
+    FLOOD_RATE_LIMIT,
+    FLOOD_RATE_WINDOW_SECONDS,
+    FLOOD_TRACKED_USERS_MAX,
+)
+from bot.services.throttling import SlidingWindowLimiter
+
+
+logger = logging.getLogger(__name__)
+
+
+class FloodControlMiddleware(BaseMiddleware):
+    """Outer update middleware dropping updates from users over the rate limit."""
+
+    def __init__(
+        self,
+        limit: int = FLOOD_RATE_LIMIT,
+        window: float = FLOOD_RATE_WINDOW_SECONDS,
+        max_users: int = FLOOD_TRACKED_USERS_MAX,
+    ) -> None:
+        self.limiter = SlidingWindowLimiter(limit, window, max_users)
+        self.passed_total = 0
+        self.throttled_total = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "passed_total": self.passed_total,
+            "throttled_total": self.throttled_total,
+            "tracked_users": len(self.limiter),
+        }
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user: User = data.get("event_from_user")
+        if user is None or db.is_admin(user.id):
+            return await handler(event, data)
+
+        if not self.limiter.hit(user.id):
+            self.throttled_total += 1
+            logger.debug("Throttled update from user %s", user.id)
+            return None
+
+        self.passed_total += 1
+        return await handler(event, data)
+
+
+flood_control = FloodControlMiddleware()
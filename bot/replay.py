@@ -0,0 +1,189 @@
+"""Replay recorded updates (see UPDATES_RECORD_PATH) through the dispatcher.
+
+    python -m bot.replay updates.jsonl [--speed 10] [--api-latency-ms 50]
+
+The Bot API is faked in-process: nothing reaches Telegram, every call just
+waits --api-latency-ms and returns a minimal valid result. Storage is in
+memory unless --database points to a scratch SQLite file. Flood control and
+the concurrency limits stay active, so an accelerated replay shows how the
+bot sheds load.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple, get_args
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
+from aiogram.enums import ParseMode
+from aiogram.methods import TelegramMethod
+from aiogram.types import Message, MessageId, Update, User
+
+from bot import db
+from bot.app import build_dispatcher
+from bot.handlers import background
+from bot.middlewares import limiters
+from bot.services import broadcaster, loop_monitor, startup
+from bot.services.delivery import start_delivery_worker
+from bot.storage import InMemoryStorage, SqliteStorage
+
+
+logger = logging.getLogger(__name__)
+
+_FAKE_BOT_ID = 42
+_FAKE_TOKEN = f"{_FAKE_BOT_ID}:replay"
+
+# How long to wait for background work after the last update
+_DRAIN_SECONDS = 60
+
+
+class FakeApiSession(BaseSession):
+    """Bot API stand-in: answers every method locally and counts the calls."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__()
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._message_id = 0
+
+    async def close(self) -> None:
+        pass
+
+    def _message(self, method: TelegramMethod) -> Dict[str, Any]:
+        self._message_id += 1
+        chat_id = getattr(method, "chat_id", None)
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id) if chat_id is not None else 0, "type": "private"},
+            "text": getattr(method, "text", None) or "",
+        }
+
+    def _result(self, method: TelegramMethod) -> Any:
+        returning = method.__returning__
+        if returning is bool or bool in get_args(returning):
+            return True
+        if returning is Message:
+            return self._message(method)
+        if returning is MessageId:
+            self._message_id += 1
+            return {"message_id": self._message_id}
+        if returning is User:
+            return {"id": _FAKE_BOT_ID, "is_bot": True, "first_name": "replay", "username": "replay_bot"}
+        raise NotImplementedError(f"Fake Bot API cannot answer {type(method).__name__}")
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        content = json.dumps({"ok": True, "result": self._result(method)})
+        return self.check_response(bot, method, 200, content).result
+
+    async def stream_content(
+        self, url: str, headers: Optional[Dict[str, Any]] = None, timeout: int = 30,
+        chunk_size: int = 65536, raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+
+def _load(path: str) -> List[Tuple[float, bool, Dict[str, Any]]]:
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                records.append((record["t"], record.get("admin", False), record["update"]))
+    records.sort(key=lambda record: record[0])
+    return records
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return values[min(int(len(values) * q), len(values) - 1)] if values else 0.0
+
+
+async def replay(path: str, speed: float, api_latency: float, database: Optional[str]) -> None:
+    db.use_storage(SqliteStorage(database) if database else InMemoryStorage())
+    records = _load(path)
+    session = FakeApiSession(api_latency)
+    bot = Bot(token=_FAKE_TOKEN, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    dp = build_dispatcher()
+
+    loop_monitor.start_loop_monitor()
+    await startup.prepare()
+    start_delivery_worker(bot)
+
+    updates = []
+    for _, admin, raw in records:
+        update = Update.model_validate(raw, context={"bot": bot})
+        user = getattr(update.event, "from_user", None)
+        if admin and user is not None and not db.is_admin(user.id):
+            await db.add_admin(user.id, 0)
+        updates.append(update)
+
+    latencies: List[float] = []
+    errors = 0
+
+    async def feed(update: Update, delay: float) -> None:
+        nonlocal errors
+        if delay > 0:
+            await asyncio.sleep(delay)
+        started = time.perf_counter()
+        try:
+            await dp.feed_update(bot, update)
+        except Exception as e:  # noqa: BLE001
+            errors += 1
+            logger.warning("Update %s failed: %r", update.update_id, e)
+        latencies.append(time.perf_counter() - started)
+
+    first_at = records[0][0] if records else 0.0
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        feed(update, (recorded_at - first_at) / speed if speed > 0 else 0.0)
+        for (recorded_at, _, _), update in zip(records, updates)
+    ))
+    fed_seconds = time.perf_counter() - started
+    await background.wait_idle(_DRAIN_SECONDS)
+    await broadcaster.flush_pending(bot, _DRAIN_SECONDS)
+    total_seconds = time.perf_counter() - started
+    await db.close_db()
+
+    latencies.sort()
+    lag = loop_monitor.stats()
+    print(f"updates: {len(latencies)}, errors: {errors}")
+    print(
+        f"latency ms: p50={_percentile(latencies, 0.50) * 1000:.1f} "
+        f"p95={_percentile(latencies, 0.95) * 1000:.1f} "
+        f"p99={_percentile(latencies, 0.99) * 1000:.1f} "
+        f"max={(latencies[-1] if latencies else 0.0) * 1000:.1f}"
+    )
+    print(
+        f"fed in {fed_seconds:.2f}s ({len(latencies) / fed_seconds if fed_seconds else 0.0:.0f} updates/s), "
+        f"background work done after {total_seconds:.2f}s"
+    )
+    print(f"event loop lag ms: p99={lag['p99_ms']:.1f} max={lag['max_ms']:.1f}, stalls: {lag['stalls']}")
+    print("shed: " + ", ".join(f"{name}={limiter.shed_total}" for name, limiter in limiters.items()))
+    print("api calls: " + ", ".join(f"{name}={count}" for name, count in session.calls.most_common()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded updates against a fake Bot API.")
+    parser.add_argument("path", help="JSONL file written via UPDATES_RECORD_PATH")
+    parser.add_argument("--speed", type=float, default=1.0, help="time acceleration; 0 = as fast as possible")
+    parser.add_argument("--api-latency-ms", type=float, default=0.0, help="simulated Bot API latency per call")
+    parser.add_argument("--database", help="scratch SQLite file to use instead of in-memory storage")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+    )
+    asyncio.run(replay(args.path, args.speed, args.api_latency_ms / 1000, args.database))
+
+
+if __name__ == "__main__":
+    main()
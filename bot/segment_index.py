@@ -0,0 +1,185 @@
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+def _insert_sorted(values: array, value: int) -> None:
+    pos = bisect_left(values, value)
+    if pos == len(values) or values[pos] != value:
+        values.insert(pos, value)
+
+
+def _remove_sorted(values: array, value: int) -> None:
+    pos = bisect_left(values, value)
+    if pos < len(values) and values[pos] == value:
+        del values[pos]
+
+
+def _with_value(values: array, value: int) -> array:
+    pos = bisect_left(values, value)
+    if pos < len(values) and values[pos] == value:
+        return values
+    return values[:pos] + array("q", (value,)) + values[pos:]
+
+
+def _without_value(values: array, value: int) -> array:
+    pos = bisect_left(values, value)
+    if pos < len(values) and values[pos] == value:
+        return values[:pos] + values[pos + 1:]
+    return values
+
+
+def _contains_sorted(values: array, value: int) -> bool:
+    pos = bisect_left(values, value)
+    return pos < len(values) and values[pos] == value
+
+
+_BANNED = 1
+_UNREACHABLE = 2
+
+
+class SegmentIndex:
+    """In-memory segment membership.
+
+    Keeps, per segment, a sorted array of tg_ids of members that are neither
+    banned nor unreachable (the broadcast audience) and, per player, a sorted array of segment ids.
+    Audience arrays are copy-on-write, so a broadcast can keep iterating the
+    array it got while admins edit the segment. Mutated only by ``bot.db``
+    right after the matching write is committed.
+    """
+
+    def __init__(self) -> None:
+        self.loaded = False
+        self._members: Dict[int, array] = {}
+        self._player_segments: Dict[int, array] = {}
+        self._player_tg: Dict[int, int] = {}
+        # player_id -> non-zero mask of _BANNED/_UNREACHABLE; such players are out of the audience
+        self._flags: Dict[int, int] = {}
+
+    def rebuild(self, rows: Iterable[Tuple[int, Optional[int], bool, bool, int]]) -> None:
+        """Replace the index with (player_id, tg_id, is_banned, is_unreachable, segment_id) rows."""
+        members: Dict[int, List[int]] = {}
+        player_segments: Dict[int, List[int]] = {}
+        player_tg: Dict[int, int] = {}
+        flags: Dict[int, int] = {}
+        for player_id, tg_id, is_banned, is_unreachable, segment_id in rows:
+            player_segments.setdefault(player_id, []).append(segment_id)
+            if tg_id is None:
+                continue
+            player_tg[player_id] = tg_id
+            mask = (_BANNED if is_banned else 0) | (_UNREACHABLE if is_unreachable else 0)
+            if mask:
+                flags[player_id] = mask
+            else:
+                members.setdefault(segment_id, []).append(tg_id)
+
+        self._members = {seg: array("q", sorted(set(ids))) for seg, ids in members.items()}
+        self._player_segments = {
+            pid: array("q", sorted(set(segs))) for pid, segs in player_segments.items()
+        }
+        self._player_tg = player_tg
+        self._flags = flags
+        self.loaded = True
+
+    def assign(
+        self,
+        player_id: int,
+        tg_id: Optional[int],
+        segment_id: int,
+        banned: bool = False,
+        unreachable: bool = False,
+    ) -> None:
+        _insert_sorted(self._player_segments.setdefault(player_id, array("q")), segment_id)
+        if tg_id is None:
+            return
+        self._player_tg[player_id] = tg_id
+        mask = (_BANNED if banned else 0) | (_UNREACHABLE if unreachable else 0)
+        if mask:
+            self._flags[player_id] = mask
+            return
+        self._flags.pop(player_id, None)
+        self._members[segment_id] = _with_value(self._members.get(segment_id, array("q")), tg_id)
+
+    def unassign(self, player_id: int, segment_id: int) -> None:
+        segments = self._player_segments.get(player_id)
+        if segments is not None:
+            _remove_sorted(segments, segment_id)
+            if not segments:
+                del self._player_segments[player_id]
+        tg_id = self._player_tg.get(player_id)
+        members = self._members.get(segment_id)
+        if tg_id is not None and members is not None:
+            self._members[segment_id] = _without_value(members, tg_id)
+        if player_id not in self._player_segments:
+            self._player_tg.pop(player_id, None)
+            self._flags.pop(player_id, None)
+
+    def _set_flag(self, player_id: int, flag: int, on: bool) -> None:
+        tg_id = self._player_tg.get(player_id)
+        if tg_id is None:
+            return
+        old = self._flags.get(player_id, 0)
+        new = old | flag if on else old & ~flag
+        if new:
+            self._flags[player_id] = new
+        else:
+            self._flags.pop(player_id, None)
+        if bool(old) == bool(new):
+            return
+        for segment_id in self._player_segments.get(player_id, ()):
+            members = self._members.get(segment_id, array("q"))
+            if new:
+                self._members[segment_id] = _without_value(members, tg_id)
+            else:
+                self._members[segment_id] = _with_value(members, tg_id)
+
+    def set_banned(self, player_id: int, banned: bool) -> None:
+        self._set_flag(player_id, _BANNED, banned)
+
+    def set_unreachable(self, player_id: int, unreachable: bool) -> None:
+        self._set_flag(player_id, _UNREACHABLE, unreachable)
+
+    def audience(self, segment_id: int, exclude_tg_id: Optional[int] = None) -> array:
+        members = self._members.get(segment_id)
+        if members is None:
+            return array("q")
+        if exclude_tg_id is not None:
+            return _without_value(members, exclude_tg_id)
+        return members
+
+    def audience_size(self, segment_id: int, exclude_tg_id: Optional[int] = None) -> int:
+        members = self._members.get(segment_id)
+        if members is None:
+            return 0
+        if exclude_tg_id is not None and _contains_sorted(members, exclude_tg_id):
+            return len(members) - 1
+        return len(members)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "segments": len(self._members),
+            "players": len(self._player_segments),
+            "memberships": sum(len(members) for members in self._members.values()),
+        }
+
+    def segments_for_player(self, player_id: int) -> List[int]:
+        return list(self._player_segments.get(player_id, ()))
+
+    def union(self, segment_ids: Iterable[int]) -> array:
+        merged: Set[int] = set()
+        for segment_id in segment_ids:
+            merged.update(self._members.get(segment_id, ()))
+        return array("q", sorted(merged))
+
+    def intersection(self, segment_ids: Iterable[int]) -> array:
+        arrays = sorted(
+            (self._members.get(segment_id, array("q")) for segment_id in segment_ids),
+            key=len,
+        )
+        if not arrays:
+            return array("q")
+        smallest, rest = arrays[0], arrays[1:]
+        return array("q", (v for v in smallest if all(_contains_sorted(a, v) for a in rest)))
+
+
+segment_index = SegmentIndex()
@@ -0,0 +1,80 @@
+import logging
+import time
+from typing import Callable, List, Optional, Tuple
+
+from bot.config import (
+    AUTO_APPROVE_HOURS,
+    AUTO_APPROVE_MIN_APPROVALS,
+    AUTO_APPROVE_SEGMENT_IDS,
+)
+from bot.storage import Player
+
+
+logger = logging.getLogger(__name__)
+
+
+class Candidate:
+    """What the rules see about a new request."""
+
+    __slots__ = ("approved_count", "segment_id", "hour")
+
+    def __init__(self, approved_count: int, segment_id: int, hour: int) -> None:
+        self.approved_count = approved_count
+        self.segment_id = segment_id
+        self.hour = hour
+
+
+Rule = Callable[[Candidate], bool]
+
+
+def _trusted(candidate: Candidate) -> bool:
+    return candidate.approved_count >= AUTO_APPROVE_MIN_APPROVALS
+
+
+def _allowed_segment(candidate: Candidate) -> bool:
+    return not AUTO_APPROVE_SEGMENT_IDS or candidate.segment_id in AUTO_APPROVE_SEGMENT_IDS
+
+
+def _within_hours(candidate: Candidate) -> bool:
+    start, end = AUTO_APPROVE_HOURS
+    if start == end:
+        return True
+    if start < end:
+        return start <= candidate.hour < end
+    return candidate.hour >= start or candidate.hour < end
+
+
+# Every rule must hold; the name is logged when one does not
+RULES: List[Tuple[str, Rule]] = [
+    ("min_approvals", _trusted),
+    ("segment", _allowed_segment),
+    ("hours", _within_hours),
+]
+
+
+def is_enabled() -> bool:
+    return AUTO_APPROVE_MIN_APPROVALS > 0
+
+
+def failed_rule(candidate: Candidate) -> Optional[str]:
+    for name, rule in RULES:
+        if not rule(candidate):
+            return name
+    return None
+
+
+def should_auto_approve(player: Player, segment_id: int, now: Optional[float] = None) -> bool:
+    """Evaluate the rules against the player's row; no extra queries.
+
+    ``approved_count`` is kept on the player row by the storage, so the
+    history check costs nothing beyond the lookup the caller already did.
+    """
+    if not is_enabled():
+        return False
+    hour = time.localtime(time.time() if now is None else now).tm_hour
+    candidate = Candidate(player.approved_count, segment_id, hour)
+    failed = failed_rule(candidate)
+    if failed:
+        logger.debug("No auto-approval for player internal_id=%s: rule %s failed", player.internal_id, failed)
+        return False
+    return True
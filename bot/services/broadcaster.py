@@ -0,0 +1,279 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Coroutine, Dict, List, Optional, Set, Tuple
+
+from aiogram import Bot
+
+from bot import db, texts
+from bot.config import BROADCAST_COALESCE_SECONDS, DEPOSIT_LINK
+from bot.services import delivery
+from bot.services.delivery import DeliveryStatus
+from bot.storage import Segment
+
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_TTL_SECONDS = 6 * 60 * 60
+
+
+class _Entry:
+    __slots__ = ("creator_tg_id", "nick", "format", "limit")
+
+    def __init__(self, creator_tg_id: int, nick: str, format: str, limit: str) -> None:
+        self.creator_tg_id = creator_tg_id
+        self.nick = nick
+        self.format = format
+        self.limit = limit
+
+
+_progress_ids = itertools.count(1)
+
+
+class BroadcastProgress:
+    """Counters of one running broadcast, reported to ``listener`` as it goes.
+
+    The listener is called once before the first send, after every send and
+    once more with ``final=True``. ``cancel()`` stops the sends that have not
+    started yet, including retries already in the delivery queue.
+    """
+
+    def __init__(
+        self, listener: Optional[Callable[["BroadcastProgress", bool], Awaitable[None]]] = None
+    ) -> None:
+        self.id = next(_progress_ids)
+        self.listener = listener
+        self.total = 0
+        self.sent = 0
+        self.failed = 0
+        self.queued = 0
+        self.started_at = time.monotonic()
+        self.cancelled = asyncio.Event()
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed + self.queued
+
+    @property
+    def remaining(self) -> int:
+        return max(self.total - self.done, 0)
+
+    def eta_seconds(self) -> Optional[float]:
+        if not self.done:
+            return None
+        return (time.monotonic() - self.started_at) / self.done * self.remaining
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+
+    async def _notify(self, final: bool) -> None:
+        if self.listener is None:
+            return
+        try:
+            await self.listener(self, final)
+        except Exception as e:  # noqa: BLE001
+            # Reporting must never stop the broadcast itself
+            logger.warning("Broadcast progress listener failed: %s", e)
+
+
+# BroadcastProgress.id -> progress of broadcasts still sending, for cancel buttons
+_running: Dict[int, BroadcastProgress] = {}
+
+
+def get_running(progress_id: int) -> Optional[BroadcastProgress]:
+    return _running.get(progress_id)
+
+
+# segment_id -> approved entries waiting for the coalescing window to close
+_pending: Dict[int, List[_Entry]] = {}
+_pending_segments: Dict[int, Segment] = {}
+# Strong references to the digest tasks (the loop only keeps weak ones) and,
+# by segment_id, those still waiting for their window to close
+_flush_tasks: Set[asyncio.Task] = set()
+_waiting: Dict[int, asyncio.Task] = {}
+
+
+def pending_count() -> int:
+    """Approved requests waiting for their digest to be flushed."""
+    return sum(len(entries) for entries in _pending.values())
+
+
+def _single_text(entry: _Entry) -> str:
+    return texts.BROADCAST_TEMPLATE.format(
+        nick=entry.nick,
+        format=entry.format,
+        limit=entry.limit,
+        deposit_link=DEPOSIT_LINK,
+    )
+
+
+def _digest_text(entries: List[_Entry]) -> str:
+    if len(entries) == 1:
+        return _single_text(entries[0])
+    footer = texts.BROADCAST_DIGEST_FOOTER.format(deposit_link=DEPOSIT_LINK)
+    more_reserve = len(texts.BROADCAST_DIGEST_MORE_TEMPLATE.format(count=len(entries))) + 2
+    lines = [texts.BROADCAST_DIGEST_HEADER]
+    size = len(texts.BROADCAST_DIGEST_HEADER) + 2 + len(footer) + more_reserve
+    for i, entry in enumerate(entries):
+        line = texts.BROADCAST_DIGEST_ITEM_TEMPLATE.format(
+            nick=entry.nick, format=entry.format, limit=entry.limit
+        )
+        # The rest is summarized so the digest stays within one message
+        if size + len(line) + 2 > texts.MESSAGE_MAX_LENGTH:
+            lines.append(texts.BROADCAST_DIGEST_MORE_TEMPLATE.format(count=len(entries) - i))
+            break
+        lines.append(line)
+        size += len(line) + 2
+    lines.append(footer)
+    return "\n\n".join(lines)
+
+
+async def send_broadcast(
+    bot: Bot,
+    segment: Segment,
+    recipients: AsyncIterable[Tuple[int, str]],
+    progress: Optional[BroadcastProgress] = None,
+) -> Tuple[int, int]:
+    """Send to every recipient, pulling them lazily; returns (sent, attempted).
+
+    With ``progress`` its counters are kept up to date (``total`` must be set
+    by the caller) and sending stops early once it is cancelled.
+    """
+    progress = progress or BroadcastProgress()
+    delete_at = int(time.time()) + BROADCAST_TTL_SECONDS
+    _running[progress.id] = progress
+    try:
+        await progress._notify(final=False)
+        async for tg_id, text in recipients:
+            if progress.cancelled.is_set():
+                logger.info("Broadcast cancelled with %d message(s) left", progress.remaining)
+                break
+            logger.info("Sending broadcast to tg_id=%s", tg_id)
+            status, _ = await delivery.send_message(
+                bot, tg_id, text, delete_at=delete_at, cancel=progress.cancelled
+            )
+            if status is DeliveryStatus.SENT:
+                progress.sent += 1
+            elif status is DeliveryStatus.FAILED:
+                progress.failed += 1
+            else:
+                progress.queued += 1
+            await progress._notify(final=False)
+    finally:
+        del _running[progress.id]
+    logger.info(
+        "Broadcast completed: sent %d/%d messages, %d queued for retry",
+        progress.sent,
+        progress.done,
+        progress.queued,
+    )
+    await progress._notify(final=True)
+
+    format_id, limit_id = segment.format_id, segment.limit_id
+    await db.record_event(db.EVENT_BROADCAST_SENT, format_id, limit_id, value=progress.sent)
+    if progress.failed:
+        await db.record_event(db.EVENT_BROADCAST_FAILED, format_id, limit_id, value=progress.failed)
+    return progress.sent, progress.done
+
+
+def _start_flush(coro: Coroutine) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _flush_tasks.add(task)
+    task.add_done_callback(_flush_tasks.discard)
+    return task
+
+
+async def _flush_later(bot: Bot, segment_id: int) -> None:
+    await asyncio.sleep(BROADCAST_COALESCE_SECONDS)
+    _waiting.pop(segment_id, None)
+    await _flush(bot, segment_id)
+
+
+async def flush_pending(bot: Bot, timeout: float) -> None:
+    """Send every waiting digest right away and wait up to ``timeout`` seconds (used on shutdown).
+
+    The requests behind the digests are already deleted, so they must not be
+    lost with the process.
+    """
+    for task in _waiting.values():
+        task.cancel()
+    _waiting.clear()
+    for segment_id in list(_pending):
+        _start_flush(_flush(bot, segment_id))
+    if not _flush_tasks:
+        return
+    logger.info("Flushing %d pending digest(s)", len(_flush_tasks))
+    _, still_running = await asyncio.wait(set(_flush_tasks), timeout=timeout)
+    if still_running:
+        logger.warning("%d digest(s) did not finish in time", len(still_running))
+
+
+async def _flush(bot: Bot, segment_id: int) -> None:
+    entries = _pending.pop(segment_id, [])
+    segment = _pending_segments.pop(segment_id, None)
+    if not entries or segment is None:
+        return
+
+    full_text = _digest_text(entries)
+    # A creator never receives their own announcement, only the others' in the digest
+    per_creator: Dict[int, Optional[str]] = {}
+    for entry in entries:
+        others = [e for e in entries if e.creator_tg_id != entry.creator_tg_id]
+        per_creator[entry.creator_tg_id] = _digest_text(others) if others else None
+
+    progress = BroadcastProgress()
+    progress.total = await db.count_segment_audience(segment_id)
+    logger.info(
+        "Flushing digest of %d request(s) for segment %s to %d recipients",
+        len(entries),
+        segment_id,
+        progress.total,
+    )
+
+    async def recipients() -> AsyncIterator[Tuple[int, str]]:
+        async for tg_id in db.iter_segment_audience(segment_id):
+            text = per_creator.get(tg_id, full_text)
+            if text is not None:
+                yield tg_id, text
+
+    await send_broadcast(bot, segment, recipients(), progress)
+
+
+async def broadcast_request(
+    bot: Bot,
+    segment: Segment,
+    creator_tg_id: int,
+    nick: str,
+    format: str,
+    limit: str,
+    progress: Optional[BroadcastProgress] = None,
+) -> bool:
+    """Broadcast an approved request to its segment.
+
+    Returns True if the request was queued into a digest instead of being sent
+    right away (coalescing enabled via BROADCAST_COALESCE_SECONDS); ``progress``
+    is only used for a broadcast sent right away.
+    """
+    segment_id = segment.id
+    entry = _Entry(creator_tg_id, nick, format, limit)
+    if BROADCAST_COALESCE_SECONDS <= 0:
+        text = _single_text(entry)
+        progress = progress or BroadcastProgress()
+        progress.total = await db.count_segment_audience(segment_id, exclude_tg_id=creator_tg_id)
+
+        async def recipients() -> AsyncIterator[Tuple[int, str]]:
+            async for tg_id in db.iter_segment_audience(segment_id, exclude_tg_id=creator_tg_id):
+                yield tg_id, text
+
+        await send_broadcast(bot, segment, recipients(), progress)
+        return False
+
+    entries = _pending.get(segment_id)
+    if entries is None:
+        _pending[segment_id] = [entry]
+        _pending_segments[segment_id] = segment
+        _waiting[segment_id] = _start_flush(_flush_later(bot, segment_id))
+    else:
+        entries.append(entry)
+    return True
@@ -0,0 +1,218 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import re
+import time
+from enum import Enum
+from typing import Any, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramNotFound,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from aiogram.types import Message
+
+from bot import db
+from bot.config import (
+    DELIVERY_BACKOFF_BASE_SECONDS,
+    DELIVERY_BACKOFF_MAX_SECONDS,
+    DELIVERY_MAX_ATTEMPTS,
+    DELIVERY_QUEUE_MAX,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class ErrorKind(Enum):
+    RETRY_AFTER = "retry_after"
+    TRANSIENT = "transient"
+    UNREACHABLE = "unreachable"
+    PERMANENT = "permanent"
+
+
+_UNREACHABLE_MARKERS = re.compile(r"chat not found|user is deactivated", re.IGNORECASE)
+
+
+class DeliveryStatus(Enum):
+    SENT = "sent"
+    QUEUED = "queued"
+    FAILED = "failed"
+
+
+def classify_error(error: Exception) -> ErrorKind:
+    if isinstance(error, TelegramRetryAfter):
+        return ErrorKind.RETRY_AFTER
+    if isinstance(error, (TelegramNetworkError, TelegramServerError, asyncio.TimeoutError)):
+        return ErrorKind.TRANSIENT
+    if isinstance(error, TelegramForbiddenError):
+        # Bot blocked by the user or the account was deleted
+        return ErrorKind.UNREACHABLE
+    if isinstance(error, (TelegramBadRequest, TelegramNotFound)) and _UNREACHABLE_MARKERS.search(str(error)):
+        return ErrorKind.UNREACHABLE
+    # Other bad requests, not found, ...: retrying cannot help
+    return ErrorKind.PERMANENT
+
+
+def backoff_delay(attempt: int) -> float:
+    # Exponential backoff with full jitter; attempt is 1-based
+    cap = min(DELIVERY_BACKOFF_MAX_SECONDS, DELIVERY_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+    return random.uniform(cap / 2, cap)
+
+
+class _Job:
+    __slots__ = ("chat_id", "text", "kwargs", "delete_at", "cancel", "attempts")
+
+    def __init__(
+        self,
+        chat_id: int,
+        text: str,
+        kwargs: dict,
+        delete_at: Optional[int],
+        cancel: Optional[asyncio.Event],
+    ) -> None:
+        self.chat_id = chat_id
+        self.text = text
+        self.kwargs = kwargs
+        self.delete_at = delete_at
+        self.cancel = cancel
+        self.attempts = 0
+
+
+_queue: List[Tuple[float, int, _Job]] = []
+_seq = itertools.count()
+_wakeup = asyncio.Event()
+# A RetryAfter is a bot-wide flood limit, so every send waits it out
+_paused_until = 0.0
+
+stats = {"sent": 0, "retried": 0, "failed": 0, "dropped": 0, "unreachable": 0, "cancelled": 0}
+
+
+def queue_size() -> int:
+    return len(_queue)
+
+
+async def _wait_pause() -> None:
+    delay = _paused_until - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+async def _attempt(bot: Bot, job: _Job) -> Tuple[Optional[Message], Optional[Exception]]:
+    global _paused_until
+    await _wait_pause()
+    job.attempts += 1
+    try:
+        msg = await bot.send_message(job.chat_id, job.text, **job.kwargs)
+    except Exception as e:  # noqa: BLE001
+        if isinstance(e, TelegramRetryAfter):
+            _paused_until = max(_paused_until, time.monotonic() + e.retry_after)
+        return None, e
+    if job.delete_at is not None:
+        # The message is out; a storage hiccup must not fail it (or the broadcast)
+        try:
+            await db.schedule_deletion(msg.chat.id, msg.message_id, job.delete_at)
+        except Exception as e:  # noqa: BLE001
+            logger.exception(
+                "Failed to schedule deletion of message %s in chat %s: %s",
+                msg.message_id,
+                msg.chat.id,
+                e,
+            )
+    stats["sent"] += 1
+    return msg, None
+
+
+def _enqueue(job: _Job, error: Exception) -> bool:
+    if job.attempts >= DELIVERY_MAX_ATTEMPTS or len(_queue) >= DELIVERY_QUEUE_MAX:
+        stats["dropped"] += 1
+        logger.error(
+            "Giving up on message to %s after %d attempt(s): %s",
+            job.chat_id,
+            job.attempts,
+            error,
+        )
+        return False
+    if isinstance(error, TelegramRetryAfter):
+        delay = error.retry_after + random.uniform(0, 1)
+    else:
+        delay = backoff_delay(job.attempts)
+    heapq.heappush(_queue, (time.monotonic() + delay, next(_seq), job))
+    stats["retried"] += 1
+    _wakeup.set()
+    logger.warning("Send to %s failed (%s), retry #%d in %.1fs", job.chat_id, error, job.attempts, delay)
+    return True
+
+
+async def _handle_failure(job: _Job, error: Exception) -> DeliveryStatus:
+    kind = classify_error(error)
+    if kind is ErrorKind.UNREACHABLE:
+        # Expected churn, not an error: drop the player from future audiences
+        stats["unreachable"] += 1
+        logger.info("Recipient %s is unreachable (%s), excluding from broadcasts", job.chat_id, error)
+        await db.set_player_unreachable(job.chat_id, True)
+        return DeliveryStatus.FAILED
+    if kind is ErrorKind.PERMANENT:
+        stats["failed"] += 1
+        logger.warning("Failed to send message to %s: %s", job.chat_id, error)
+        return DeliveryStatus.FAILED
+    return DeliveryStatus.QUEUED if _enqueue(job, error) else DeliveryStatus.FAILED
+
+
+async def send_message(
+    bot: Bot,
+    chat_id: int,
+    text: str,
+    delete_at: Optional[int] = None,
+    cancel: Optional[asyncio.Event] = None,
+    **kwargs: Any,
+) -> Tuple[DeliveryStatus, Optional[Message]]:
+    """Send now; transient failures go to the retry queue instead of being lost.
+
+    If ``delete_at`` is given, the delivered message is scheduled for deletion.
+    A queued retry is dropped once ``cancel`` is set.
+    """
+    job = _Job(chat_id, text, kwargs, delete_at, cancel)
+    msg, error = await _attempt(bot, job)
+    if error is None:
+        return DeliveryStatus.SENT, msg
+    return await _handle_failure(job, error), None
+
+
+async def _delivery_worker(bot: Bot) -> None:
+    while True:
+        if not _queue:
+            _wakeup.clear()
+            await _wakeup.wait()
+            continue
+        due_at = _queue[0][0]
+        delay = due_at - time.monotonic()
+        if delay > 0:
+            _wakeup.clear()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        _, _, job = heapq.heappop(_queue)
+        if job.cancel is not None and job.cancel.is_set():
+            stats["cancelled"] += 1
+            continue
+        try:
+            _, error = await _attempt(bot, job)
+            if error is not None:
+                await _handle_failure(job, error)
+        except Exception as e:  # noqa: BLE001
+            logger.exception("Error in delivery worker: %s", e)
+
+
+def start_delivery_worker(bot: Bot) -> None:
+    asyncio.create_task(_delivery_worker(bot))
@@ -0,0 +1,24 @@
+import asyncio
+import csv
+import gzip
+
+from bot import db
+
+
+EXPORT_COLUMNS = ("internal_id", "tg_id", "username", "nick", "is_banned", "created_at", "segments")
+
+
+async def export_players_csv_gz(path: str, page_size: int = 1000) -> int:
+    """Write players with their segments to a gzipped CSV file page by page.
+
+    Only one page of rows is held in memory at a time; compression and file
+    writes run in a worker thread. Returns the number of exported players.
+    """
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_COLUMNS)
+        async for page in db.iter_players_with_segments(page_size):
+            await asyncio.to_thread(writer.writerows, page)
+            count += len(page)
+    return count
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+
+from bot import db
+from bot.config import LEADER_LEASE_SECONDS, LEADER_RENEW_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "background_workers"
+
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Monotonic deadline until which our last renewal is known to hold. Kept one
+# renew interval short of the lease so we stop working before anyone can take over.
+_leader_until = 0.0
+
+
+def is_leader() -> bool:
+    return time.monotonic() < _leader_until
+
+
+async def _renew() -> None:
+    global _leader_until
+    was_leader = is_leader()
+    started = time.monotonic()
+    try:
+        acquired = await db.try_acquire_lease(LEASE_NAME, INSTANCE_ID, LEADER_LEASE_SECONDS)
+    except Exception as e:  # noqa: BLE001
+        logger.exception("Failed to renew leader lease: %s", e)
+        acquired = False
+    if acquired:
+        _leader_until = started + LEADER_LEASE_SECONDS - LEADER_RENEW_SECONDS
+        if not was_leader:
+            logger.info("Instance %s became leader", INSTANCE_ID)
+    elif was_leader:
+        # Still inside our own deadline; let it lapse unless the next renewal succeeds
+        logger.warning("Instance %s could not renew the leader lease", INSTANCE_ID)
+
+
+async def _sync_caches() -> None:
+    # Every instance, leader or not, picks up cache changes made by the others
+    try:
+        changed = await db.sync_caches()
+    except Exception as e:  # noqa: BLE001
+        logger.exception("Failed to sync caches: %s", e)
+        return
+    if changed:
+        logger.info("Reloaded changed caches: %s", ", ".join(changed))
+
+
+async def _leader_worker() -> None:
+    while True:
+        await _renew()
+        await _sync_caches()
+        await asyncio.sleep(LEADER_RENEW_SECONDS)
+
+
+async def start_leader_election() -> None:
+    # First attempt happens before the workers start, so a lone instance
+    # does its background work right away
+    await _renew()
+    if not is_leader():
+        logger.info("Instance %s is a follower", INSTANCE_ID)
+    asyncio.create_task(_leader_worker())
+
+
+async def resign() -> None:
+    global _leader_until
+    if not is_leader():
+        return
+    _leader_until = 0.0
+    try:
+        await db.release_lease(LEASE_NAME, INSTANCE_ID)
+    except Exception as e:  # noqa: BLE001
+        logger.exception("Failed to release leader lease: %s", e)
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from bot.config import (
+    LOOP_LAG_THRESHOLD_SECONDS,
+    LOOP_MONITOR_INTERVAL_SECONDS,
+    LOOP_STALLS_KEPT,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Lag samples kept for percentiles: ~8 minutes at the default interval
+_LAG_SAMPLES = 1000
+
+
+class Stall:
+    __slots__ = ("at", "lag", "stack")
+
+    def __init__(self, at: float, lag: float, stack: str) -> None:
+        self.at = at
+        self.lag = lag
+        self.stack = stack
+
+
+_lags: Deque[float] = deque(maxlen=_LAG_SAMPLES)
+stalls: Deque[Stall] = deque(maxlen=LOOP_STALLS_KEPT)
+
+# Written by the loop, read by the watchdog thread
+_last_tick = 0.0
+_tick = 0
+_loop_thread_id: Optional[int] = None
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return values[min(int(len(values) * q), len(values) - 1)] if values else 0.0
+
+
+def stats() -> Dict[str, Any]:
+    lags = sorted(_lags)
+    return {
+        "samples": len(lags),
+        "p50_ms": _percentile(lags, 0.50) * 1000,
+        "p95_ms": _percentile(lags, 0.95) * 1000,
+        "p99_ms": _percentile(lags, 0.99) * 1000,
+        "max_ms": (lags[-1] if lags else 0.0) * 1000,
+        "stalls": len(stalls),
+    }
+
+
+async def _measure() -> None:
+    global _last_tick, _tick
+    while True:
+        started = time.monotonic()
+        await asyncio.sleep(LOOP_MONITOR_INTERVAL_SECONDS)
+        lag = max(0.0, time.monotonic() - started - LOOP_MONITOR_INTERVAL_SECONDS)
+        _lags.append(lag)
+        _last_tick = time.monotonic()
+        _tick += 1
+        if lag >= LOOP_LAG_THRESHOLD_SECONDS:
+            logger.warning("Event loop lagged %.0fms", lag * 1000)
+
+
+def _watchdog() -> None:
+    # Runs in its own thread: while the loop is blocked it cannot observe
+    # itself, so the blocked thread's stack is sampled from here
+    sampled_tick = -1
+    deadline = LOOP_MONITOR_INTERVAL_SECONDS + LOOP_LAG_THRESHOLD_SECONDS
+    while True:
+        time.sleep(LOOP_LAG_THRESHOLD_SECONDS / 2)
+        stalled_for = time.monotonic() - _last_tick
+        if stalled_for < deadline or _tick == sampled_tick:
+            continue
+        frame = sys._current_frames().get(_loop_thread_id)
+        if frame is None:
+            continue
+        sampled_tick = _tick
+        stack = "".join(traceback.format_stack(frame))
+        stalls.append(Stall(time.time(), stalled_for - LOOP_MONITOR_INTERVAL_SECONDS, stack))
+        logger.warning(
+            "Event loop blocked for %.0fms+, loop thread stack:\n%s",
+            (stalled_for - LOOP_MONITOR_INTERVAL_SECONDS) * 1000,
+            stack,
+        )
+
+
+def start_loop_monitor() -> None:
+    global _last_tick, _loop_thread_id
+    _loop_thread_id = threading.get_ident()
+    _last_tick = time.monotonic()
+    asyncio.create_task(_measure())
+    threading.Thread(target=_watchdog, name="loop-watchdog", daemon=True).start()
@@ -0,0 +1,72 @@
+import gc
+import os
+import sys
+import tracemalloc
+from collections import Counter
+from typing import List, Optional, Tuple
+
+
+# Frames tracemalloc reports for each allocation site
+_TRACE_FRAMES = 1
+
+# Snapshot of the previous /memstats call while tracing, for the diff
+_previous_snapshot: Optional[tracemalloc.Snapshot] = None
+
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def rss_bytes() -> Tuple[int, bool]:
+    """Current RSS and True, or peak RSS and False where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE"), True
+    except (OSError, ValueError, IndexError, AttributeError):
+        import resource  # not available on Windows
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Bytes on macOS, kilobytes elsewhere
+        return (peak if sys.platform == "darwin" else peak * 1024), False
+
+
+def top_types(limit: int) -> List[Tuple[str, int]]:
+    # One pass over every GC-tracked object; fine on demand, too slow to poll
+    counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+    return counts.most_common(limit)
+
+
+def is_tracing() -> bool:
+    return tracemalloc.is_tracing()
+
+
+def start_tracing() -> None:
+    global _previous_snapshot
+    _previous_snapshot = None
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(_TRACE_FRAMES)
+
+
+def stop_tracing() -> None:
+    global _previous_snapshot
+    _previous_snapshot = None
+    tracemalloc.stop()
+
+
+def allocation_report(limit: int) -> Tuple[List[str], List[str]]:
+    """Top allocation sites now and the biggest changes since the previous call.
+
+    Both lists are empty unless tracing is on; the diff is empty on the first call.
+    """
+    global _previous_snapshot
+    if not tracemalloc.is_tracing():
+        return [], []
+    snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    top = [str(stat) for stat in snapshot.statistics("lineno")[:limit]]
+    diff: List[str] = []
+    if _previous_snapshot is not None:
+        diff = [str(stat) for stat in snapshot.compare_to(_previous_snapshot, "lineno")[:limit]]
+    _previous_snapshot = snapshot
+    return top, diff
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+import time
+
+from bot import db
+from bot.config import (
+    RETENTION_BATCH_SIZE,
+    RETENTION_INTERVAL_SECONDS,
+    RETENTION_POLICIES,
+    RETENTION_VACUUM_PAGES,
+)
+from bot.services.leader import is_leader
+
+
+logger = logging.getLogger(__name__)
+
+# Pause between purge batches so other writers can take the lock
+_BATCH_PAUSE_SECONDS = 0.05
+
+
+async def purge_table(table: str, max_age_seconds: int) -> int:
+    cutoff_ts = int(time.time()) - max_age_seconds
+    purged = 0
+    while True:
+        deleted = await db.purge_expired_batch(table, cutoff_ts, RETENTION_BATCH_SIZE)
+        purged += deleted
+        if deleted < RETENTION_BATCH_SIZE:
+            return purged
+        await asyncio.sleep(_BATCH_PAUSE_SECONDS)
+
+
+async def run_retention() -> None:
+    for table, max_age_seconds in RETENTION_POLICIES.items():
+        purged = await purge_table(table, max_age_seconds)
+        if purged:
+            logger.info("Retention: purged %d rows from %s", purged, table)
+
+    reclaimed = await db.incremental_vacuum(RETENTION_VACUUM_PAGES)
+    report = await db.get_storage_report()
+    tables = ", ".join(f"{name}={size}" for name, size in report["table_bytes"].items())
+    logger.info(
+        "Storage: %d pages x %d bytes, %d free, %d reclaimed; table bytes: %s",
+        report["page_count"],
+        report["page_size"],
+        report["freelist_count"],
+        reclaimed,
+        tables or "n/a",
+    )
+
+
+async def _retention_worker() -> None:
+    while True:
+        if is_leader():
+            try:
+                await run_retention()
+            except Exception as e:  # noqa: BLE001
+                logger.exception("Error in retention worker: %s", e)
+
+        await asyncio.sleep(RETENTION_INTERVAL_SECONDS)
+
+
+def start_retention_worker() -> None:
+    asyncio.create_task(_retention_worker())
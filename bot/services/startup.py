@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Dict, Optional
+
+from bot import db
+
+
+logger = logging.getLogger(__name__)
+
+# Strong reference: the loop only keeps a weak one to the running task
+_warm_up_task: Optional[asyncio.Task] = None
+
+
+async def _timed(phase: str, step: Awaitable[object], timings: Dict[str, float]) -> object:
+    started = time.perf_counter()
+    try:
+        return await step
+    finally:
+        timings[phase] = time.perf_counter() - started
+
+
+def _format_timings(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{phase}={seconds * 1000:.1f}ms" for phase, seconds in timings.items())
+
+
+async def _warm_up(started_at: float) -> None:
+    timings: Dict[str, float] = {}
+    results = await asyncio.gather(
+        _timed("segment_index", db.load_segment_index(), timings),
+        _timed("catalog", db.load_catalog(), timings),
+        _timed("bans", db.load_ban_cache(), timings),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            # Handlers fall back to the database for anything left cold
+            logger.error("Cache warm-up step failed: %r", result)
+    if results[0] is False:
+        logger.warning("Segment index not loaded: assignments kept changing during the load")
+    logger.info(
+        "Warm-up finished %.1fms after start: %s",
+        (time.perf_counter() - started_at) * 1000,
+        _format_timings(timings),
+    )
+
+
+async def prepare() -> None:
+    """Run the startup steps polling depends on and start cache warm-up.
+
+    Only the schema check and the admin roster block (permission checks must
+    not see a stale roster); the other caches are warmed concurrently in the
+    background while polling starts.
+    """
+    global _warm_up_task
+    started_at = time.perf_counter()
+    ddl_ran = await db.init_db()
+    schema_seconds = time.perf_counter() - started_at
+    # Before any cache loads, so a change made meanwhile is picked up by the first sync
+    await db.load_cache_versions()
+    await db.load_admins()
+    _warm_up_task = asyncio.create_task(_warm_up(started_at))
+    logger.info(
+        "Ready to poll: schema=%.1fms (%s)",
+        schema_seconds * 1000,
+        "created/upgraded" if ddl_ran else "up to date, DDL skipped",
+    )
@@ -0,0 +1,98 @@
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Hashable, Optional
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float) -> None:
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets: ``capacity`` tokens, one refilled every ``refill_seconds``."""
+
+    def __init__(self, capacity: int, refill_seconds: float, max_keys: int = 10_000) -> None:
+        self.capacity = capacity
+        self.refill_rate = 1.0 / refill_seconds
+        self.max_keys = max_keys
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _refill(self, bucket: TokenBucket, now: float) -> None:
+        bucket.tokens = min(self.capacity, bucket.tokens + (now - bucket.updated_at) * self.refill_rate)
+        bucket.updated_at = now
+
+    def _prune(self, now: float) -> None:
+        # A bucket that has refilled to capacity carries no state worth keeping
+        full_after = self.capacity / self.refill_rate
+        stale = [key for key, b in self._buckets.items() if now - b.updated_at >= full_after]
+        for key in stale:
+            del self._buckets[key]
+
+    def consume(self, key: Hashable, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            bucket = self._buckets[key] = TokenBucket(float(self.capacity), now)
+        else:
+            self._refill(bucket, now)
+        if bucket.tokens < 1:
+            return False
+        bucket.tokens -= 1
+        return True
+
+    def refund(self, key: Hashable) -> None:
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.tokens = min(self.capacity, bucket.tokens + 1)
+
+
+class SlidingWindowLimiter:
+    """At most ``limit`` hits per key within any ``window`` seconds.
+
+    Keys live in an LRU-ordered dict: idle keys expire after ``window`` and the
+    least recently seen key is evicted once ``max_keys`` are tracked, so memory
+    is bounded regardless of how many users ever wrote to the bot.
+    """
+
+    def __init__(self, limit: int, window: float, max_keys: int = 50_000) -> None:
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._hits: "OrderedDict[Hashable, Deque[float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._hits)
+
+    def _expire(self, now: float) -> None:
+        while self._hits:
+            key, hits = next(iter(self._hits.items()))
+            if hits and now - hits[-1] < self.window:
+                break
+            del self._hits[key]
+
+    def hit(self, key: Hashable, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+
+        hits = self._hits.get(key)
+        if hits is None:
+            if len(self._hits) >= self.max_keys:
+                self._hits.popitem(last=False)
+            hits = self._hits[key] = deque()
+        else:
+            self._hits.move_to_end(key)
+
+        while hits and now - hits[0] >= self.window:
+            hits.popleft()
+        if len(hits) >= self.limit:
+            return False
+        hits.append(now)
+        return True
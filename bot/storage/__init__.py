@@ -0,0 +1,26 @@
+from .base import Storage
+from .memory import InMemoryStorage
+from .records import Format, Limit, Player, Request, ScheduledDeletion, Segment
+from .sqlite import SqliteStorage
+
+
+def create_storage(backend: str, database_path: str) -> Storage:
+    if backend == "sqlite":
+        return SqliteStorage(database_path)
+    if backend == "memory":
+        return InMemoryStorage()
+    raise ValueError(f"Unknown storage backend: {backend!r}")
+
+
+__all__ = [
+    "Format",
+    "InMemoryStorage",
+    "Limit",
+    "Player",
+    "Request",
+    "ScheduledDeletion",
+    "Segment",
+    "SqliteStorage",
+    "Storage",
+    "create_storage",
+]
@@ -0,0 +1,219 @@
+import re
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from bot.storage.records import Format, Limit, Player, Request, ScheduledDeletion, Segment
+
+
+EVENT_REQUEST_CREATED = "request_created"
+EVENT_REQUEST_APPROVED = "request_approved"
+EVENT_REQUEST_REJECTED = "request_rejected"
+EVENT_BROADCAST_SENT = "broadcast_sent"
+EVENT_BROADCAST_FAILED = "broadcast_failed"
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# Word characters without "_", matching how the FTS5 unicode61 tokenizer splits text
+_SEARCH_TERM_RE = re.compile(r"[^\W_]+")
+
+
+def search_terms(query: str) -> List[str]:
+    """Lower-cased words of a player search query; every one must prefix-match."""
+    return [term.casefold() for term in _SEARCH_TERM_RE.findall(query)]
+
+
+class Storage(ABC):
+    """Repository interface behind ``bot.db``.
+
+    Implementations only store and fetch data; caching (segment index,
+    catalog, bans) lives in ``bot.db`` and works the same for every backend.
+    Entity rows are returned as the records of ``bot.storage.records``;
+    aggregates and reports as plain dicts.
+    """
+
+    @abstractmethod
+    async def init(self) -> bool:
+        """Prepare the storage; returns False if nothing had to be created."""
+
+    async def close(self) -> None:
+        """Flush pending writes and release connections."""
+
+    # Players
+
+    @abstractmethod
+    async def get_player_by_tg_id(self, tg_id: int) -> Optional[Player]: ...
+
+    @abstractmethod
+    async def get_player_by_internal_id(self, internal_id: int) -> Optional[Player]: ...
+
+    @abstractmethod
+    async def create_player(self, tg_id: int, username: Optional[str], created_at: int) -> Player:
+        """Insert the player, or return the existing one if tg_id is taken."""
+
+    @abstractmethod
+    async def update_player_username(self, tg_id: int, username: Optional[str]) -> None: ...
+
+    @abstractmethod
+    async def set_player_nick(self, internal_id: int, nick: str) -> None: ...
+
+    @abstractmethod
+    async def set_player_ban(self, internal_id: int, banned: bool) -> None: ...
+
+    @abstractmethod
+    async def set_player_unreachable(self, internal_id: int, unreachable: bool) -> None: ...
+
+    @abstractmethod
+    async def get_banned_tg_ids(self) -> List[int]: ...
+
+    @abstractmethod
+    async def search_players(self, terms: List[str], offset: int, limit: int) -> List[Player]:
+        """Players whose nick or username has a word starting with each term, by internal_id."""
+
+    @abstractmethod
+    def iter_players_with_segments(self, page_size: int) -> AsyncIterator[List[Tuple[Any, ...]]]:
+        """Pages of (internal_id, tg_id, username, nick, is_banned, created_at, segments)."""
+
+    # Catalog
+
+    @abstractmethod
+    async def add_format(self, name: str) -> int: ...
+
+    @abstractmethod
+    async def add_limit(self, name: str) -> int: ...
+
+    @abstractmethod
+    async def link_format_limit(self, format_id: int, limit_id: int) -> None: ...
+
+    @abstractmethod
+    async def get_formats(self) -> List[Format]: ...
+
+    @abstractmethod
+    async def get_limits(self) -> List[Limit]: ...
+
+    @abstractmethod
+    async def get_format_limit_links(self) -> List[Tuple[int, int]]: ...
+
+    # Segments
+
+    @abstractmethod
+    async def get_or_create_segment(self, format_id: int, limit_id: int) -> int: ...
+
+    @abstractmethod
+    async def get_segment_by_pair(self, format_id: int, limit_id: int) -> Optional[Segment]: ...
+
+    @abstractmethod
+    async def assign_segment(self, player_id: int, segment_id: int) -> None: ...
+
+    @abstractmethod
+    async def unassign_segment(self, player_id: int, segment_id: int) -> None: ...
+
+    @abstractmethod
+    async def get_segments_for_player(self, player_id: int) -> List[int]: ...
+
+    @abstractmethod
+    async def get_segments_with_names(self, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """One page of segments with their format and limit names, ordered by id."""
+
+    @abstractmethod
+    async def count_segments(self) -> int: ...
+
+    @abstractmethod
+    def iter_segment_audience(self, segment_id: int, page_size: int) -> AsyncIterator[List[int]]:
+        """Pages of tg_ids of the segment's members that are neither banned nor unreachable."""
+
+    @abstractmethod
+    async def count_segment_audience(self, segment_id: int, exclude_tg_id: Optional[int] = None) -> int: ...
+
+    @abstractmethod
+    async def get_segment_assignments(self) -> List[Tuple[int, Optional[int], bool, bool, int]]:
+        """All (player_id, tg_id, is_banned, is_unreachable, segment_id) rows, for the segment index."""
+
+    # Requests
+
+    @abstractmethod
+    async def create_request(self, player_id: int, format_id: int, limit_id: int, created_at: int) -> int:
+        """Insert a request and its request_created event atomically."""
+
+    @abstractmethod
+    async def get_request_by_id(self, request_id: int) -> Optional[Request]: ...
+
+    @abstractmethod
+    async def get_pending_request(
+        self, player_id: int, format_id: int, limit_id: int
+    ) -> Optional[Request]: ...
+
+    @abstractmethod
+    async def delete_request(self, request_id: int) -> None: ...
+
+    # Statistics
+
+    @abstractmethod
+    async def record_event(
+        self,
+        kind: str,
+        format_id: int,
+        limit_id: int,
+        player_id: Optional[int],
+        value: int,
+        created_at: int,
+    ) -> None:
+        """Log the event and add it to the daily rollup.
+
+        A request_approved event also bumps the player's ``approved_count``.
+        """
+
+    @abstractmethod
+    async def get_stats_since_day(self, since_day: int) -> List[Dict[str, Any]]: ...
+
+    # Scheduled deletions
+
+    @abstractmethod
+    async def schedule_deletion(self, chat_id: int, message_id: int, delete_at: int) -> None: ...
+
+    @abstractmethod
+    async def get_due_scheduled_deletions(self, now_ts: int) -> List[ScheduledDeletion]: ...
+
+    @abstractmethod
+    async def delete_scheduled_deletions(self, ids: List[int]) -> None: ...
+
+    # Maintenance
+
+    @abstractmethod
+    async def purge_expired_batch(self, table: str, cutoff_ts: int, batch_size: int) -> int: ...
+
+    @abstractmethod
+    async def incremental_vacuum(self, max_pages: int) -> int: ...
+
+    @abstractmethod
+    async def get_storage_report(self) -> Dict[str, Any]: ...
+
+    # Admins
+
+    @abstractmethod
+    async def get_admin_ids(self) -> List[int]: ...
+
+    @abstractmethod
+    async def add_admin(self, tg_id: int, added_by: Optional[int], created_at: int) -> bool:
+        """Returns False if ``tg_id`` already was an admin."""
+
+    @abstractmethod
+    async def remove_admin(self, tg_id: int) -> bool:
+        """Returns False if ``tg_id`` was not an admin."""
+
+    # Leases
+
+    @abstractmethod
+    async def try_acquire_lease(self, name: str, holder: str, ttl_seconds: float, now: float) -> bool:
+        """Take or renew the named lease for ``holder``; False while someone else holds it."""
+
+    @abstractmethod
+    async def release_lease(self, name: str, holder: str) -> None: ...
+
+    # Cache versions
+
+    @abstractmethod
+    async def bump_cache_version(self, name: str) -> None:
+        """Tell other instances that the data behind the named cache changed."""
+
+    @abstractmethod
+    async def get_cache_versions(self) -> Dict[str, int]: ...
@@ -0,0 +1,401 @@
+import itertools
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from bot.storage.base import EVENT_REQUEST_APPROVED, EVENT_REQUEST_CREATED, SECONDS_PER_DAY, Storage, search_terms
+from bot.storage.records import Format, Limit, Player, Request, ScheduledDeletion, Segment
+
+
+class InMemoryStorage(Storage):
+    """Dict-backed storage with the same semantics as the SQLite schema.
+
+    Nothing is persisted. Meant for benchmarks and as a zero-I/O baseline for
+    measuring storage overhead; run it with a single bot process only.
+    """
+
+    def __init__(self) -> None:
+        self._ids: Dict[str, "itertools.count[int]"] = {}
+        self.players: Dict[int, Dict[str, Any]] = {}
+        self.player_by_tg: Dict[int, int] = {}
+        self.formats: Dict[int, Dict[str, Any]] = {}
+        self.limits: Dict[int, Dict[str, Any]] = {}
+        self.format_limits: Set[Tuple[int, int]] = set()
+        self.segments: Dict[int, Dict[str, Any]] = {}
+        self.segment_by_pair: Dict[Tuple[int, int], int] = {}
+        self.assignments: Set[Tuple[int, int]] = set()
+        self.requests: Dict[int, Dict[str, Any]] = {}
+        self.events: Dict[int, Dict[str, Any]] = {}
+        self.daily_stats: Dict[Tuple[int, int, int, str], int] = {}
+        self.scheduled_deletions: Dict[int, Dict[str, Any]] = {}
+        self.admins: Dict[int, Dict[str, Any]] = {}
+        self.leases: Dict[str, Tuple[str, float]] = {}
+        self.cache_versions: Dict[str, int] = {}
+
+    def _next_id(self, table: str) -> int:
+        counter = self._ids.setdefault(table, itertools.count(1))
+        return next(counter)
+
+    async def init(self) -> bool:
+        return False
+
+    # Players
+
+    async def get_player_by_tg_id(self, tg_id: int) -> Optional[Player]:
+        internal_id = self.player_by_tg.get(tg_id)
+        return await self.get_player_by_internal_id(internal_id) if internal_id is not None else None
+
+    async def get_player_by_internal_id(self, internal_id: int) -> Optional[Player]:
+        player = self.players.get(internal_id)
+        return Player(**player) if player else None
+
+    async def create_player(self, tg_id: int, username: Optional[str], created_at: int) -> Player:
+        if tg_id in self.player_by_tg:
+            return Player(**self.players[self.player_by_tg[tg_id]])
+        internal_id = self._next_id("players")
+        self.players[internal_id] = {
+            "internal_id": internal_id,
+            "tg_id": tg_id,
+            "username": username,
+            "nick": None,
+            "is_banned": 0,
+            "created_at": created_at,
+            "is_unreachable": 0,
+            "approved_count": 0,
+        }
+        self.player_by_tg[tg_id] = internal_id
+        return Player(**self.players[internal_id])
+
+    async def update_player_username(self, tg_id: int, username: Optional[str]) -> None:
+        internal_id = self.player_by_tg.get(tg_id)
+        if internal_id is not None:
+            self.players[internal_id]["username"] = username
+
+    async def set_player_nick(self, internal_id: int, nick: str) -> None:
+        if internal_id in self.players:
+            self.players[internal_id]["nick"] = nick
+
+    async def set_player_ban(self, internal_id: int, banned: bool) -> None:
+        if internal_id in self.players:
+            self.players[internal_id]["is_banned"] = 1 if banned else 0
+
+    async def set_player_unreachable(self, internal_id: int, unreachable: bool) -> None:
+        if internal_id in self.players:
+            self.players[internal_id]["is_unreachable"] = 1 if unreachable else 0
+
+    async def get_banned_tg_ids(self) -> List[int]:
+        return [p["tg_id"] for p in self.players.values() if p["is_banned"] and p["tg_id"] is not None]
+
+    async def search_players(self, terms: List[str], offset: int, limit: int) -> List[Player]:
+        # Linear scan; fine for the data sizes this backend is meant for
+        if not terms:
+            return []
+        found = []
+        for internal_id in sorted(self.players):
+            p = self.players[internal_id]
+            words = search_terms(f"{p['nick'] or ''} {p['username'] or ''}")
+            if all(any(word.startswith(term) for word in words) for term in terms):
+                found.append(Player(**p))
+        return found[offset:offset + limit]
+
+    async def iter_players_with_segments(self, page_size: int) -> AsyncIterator[List[Tuple[Any, ...]]]:
+        segments_by_player: Dict[int, List[int]] = {}
+        for player_id, segment_id in sorted(self.assignments):
+            segments_by_player.setdefault(player_id, []).append(segment_id)
+        ids = sorted(self.players)
+        for start in range(0, len(ids), page_size):
+            page = []
+            for internal_id in ids[start:start + page_size]:
+                p = self.players.get(internal_id)
+                if p is None:
+                    continue
+                segments = segments_by_player.get(internal_id)
+                page.append(
+                    (
+                        p["internal_id"],
+                        p["tg_id"],
+                        p["username"],
+                        p["nick"],
+                        p["is_banned"],
+                        p["created_at"],
+                        " ".join(str(s) for s in segments) if segments else None,
+                    )
+                )
+            yield page
+
+    # Catalog
+
+    def _add_named(self, table: str, name: str) -> int:
+        rows: Dict[int, Dict[str, Any]] = getattr(self, table)
+        for item in rows.values():
+            if item["name"] == name:
+                return item["id"]
+        item_id = self._next_id(table)
+        rows[item_id] = {"id": item_id, "name": name}
+        return item_id
+
+    async def add_format(self, name: str) -> int:
+        return self._add_named("formats", name)
+
+    async def add_limit(self, name: str) -> int:
+        return self._add_named("limits", name)
+
+    async def link_format_limit(self, format_id: int, limit_id: int) -> None:
+        self.format_limits.add((format_id, limit_id))
+
+    async def get_formats(self) -> List[Format]:
+        return [Format(**self.formats[i]) for i in sorted(self.formats)]
+
+    async def get_limits(self) -> List[Limit]:
+        return [Limit(**self.limits[i]) for i in sorted(self.limits)]
+
+    async def get_format_limit_links(self) -> List[Tuple[int, int]]:
+        return sorted(self.format_limits, key=lambda link: link[1])
+
+    # Segments
+
+    async def get_or_create_segment(self, format_id: int, limit_id: int) -> int:
+        segment_id = self.segment_by_pair.get((format_id, limit_id))
+        if segment_id is not None:
+            return segment_id
+        segment_id = self._next_id("segments")
+        self.segments[segment_id] = {"id": segment_id, "format_id": format_id, "limit_id": limit_id}
+        self.segment_by_pair[(format_id, limit_id)] = segment_id
+        return segment_id
+
+    async def get_segment_by_pair(self, format_id: int, limit_id: int) -> Optional[Segment]:
+        segment_id = self.segment_by_pair.get((format_id, limit_id))
+        return Segment(**self.segments[segment_id]) if segment_id is not None else None
+
+    async def assign_segment(self, player_id: int, segment_id: int) -> None:
+        self.assignments.add((player_id, segment_id))
+
+    async def unassign_segment(self, player_id: int, segment_id: int) -> None:
+        self.assignments.discard((player_id, segment_id))
+
+    async def get_segments_for_player(self, player_id: int) -> List[int]:
+        return sorted(seg for pid, seg in self.assignments if pid == player_id)
+
+    def _segments_with_names(self) -> List[Dict[str, Any]]:
+        result = []
+        for segment_id in sorted(self.segments):
+            seg = self.segments[segment_id]
+            fmt = self.formats.get(seg["format_id"])
+            lim = self.limits.get(seg["limit_id"])
+            if fmt is None or lim is None:
+                continue
+            result.append(
+                {
+                    "segment_id": segment_id,
+                    "format_id": seg["format_id"],
+                    "limit_id": seg["limit_id"],
+                    "format_name": fmt["name"],
+                    "limit_name": lim["name"],
+                }
+            )
+        return result
+
+    async def get_segments_with_names(self, offset: int, limit: int) -> List[Dict[str, Any]]:
+        return self._segments_with_names()[offset:offset + limit]
+
+    async def count_segments(self) -> int:
+        return len(self._segments_with_names())
+
+    def _segment_audience(self, segment_id: int) -> List[Tuple[int, int]]:
+        audience = []
+        for pid, seg in self.assignments:
+            player = self.players.get(pid)
+            if (
+                seg == segment_id
+                and player
+                and not player["is_banned"]
+                and not player["is_unreachable"]
+                and player["tg_id"] is not None
+            ):
+                audience.append((pid, player["tg_id"]))
+        return sorted(audience)
+
+    async def iter_segment_audience(self, segment_id: int, page_size: int) -> AsyncIterator[List[int]]:
+        audience = self._segment_audience(segment_id)
+        for start in range(0, len(audience), page_size):
+            yield [tg_id for _, tg_id in audience[start:start + page_size]]
+
+    async def count_segment_audience(self, segment_id: int, exclude_tg_id: Optional[int] = None) -> int:
+        return sum(1 for _, tg_id in self._segment_audience(segment_id) if tg_id != exclude_tg_id)
+
+    async def get_segment_assignments(self) -> List[Tuple[int, Optional[int], bool, bool, int]]:
+        return [
+            (
+                pid,
+                self.players[pid]["tg_id"],
+                bool(self.players[pid]["is_banned"]),
+                bool(self.players[pid]["is_unreachable"]),
+                seg,
+            )
+            for pid, seg in self.assignments
+            if pid in self.players
+        ]
+
+    # Requests
+
+    async def create_request(self, player_id: int, format_id: int, limit_id: int, created_at: int) -> int:
+        request_id = self._next_id("requests")
+        self.requests[request_id] = {
+            "id": request_id,
+            "player_id": player_id,
+            "format_id": format_id,
+            "limit_id": limit_id,
+            "created_at": created_at,
+        }
+        await self.record_event(EVENT_REQUEST_CREATED, format_id, limit_id, player_id, 1, created_at)
+        return request_id
+
+    async def get_request_by_id(self, request_id: int) -> Optional[Request]:
+        request = self.requests.get(request_id)
+        return Request(**request) if request else None
+
+    async def get_pending_request(
+        self, player_id: int, format_id: int, limit_id: int
+    ) -> Optional[Request]:
+        for request in self.requests.values():
+            if (request["player_id"], request["format_id"], request["limit_id"]) == (player_id, format_id, limit_id):
+                return Request(**request)
+        return None
+
+    async def delete_request(self, request_id: int) -> None:
+        self.requests.pop(request_id, None)
+
+    # Statistics
+
+    async def record_event(
+        self,
+        kind: str,
+        format_id: int,
+        limit_id: int,
+        player_id: Optional[int],
+        value: int,
+        created_at: int,
+    ) -> None:
+        event_id = self._next_id("events")
+        self.events[event_id] = {
+            "id": event_id,
+            "kind": kind,
+            "player_id": player_id,
+            "format_id": format_id,
+            "limit_id": limit_id,
+            "value": value,
+            "created_at": created_at,
+        }
+        key = (created_at // SECONDS_PER_DAY, format_id, limit_id, kind)
+        self.daily_stats[key] = self.daily_stats.get(key, 0) + value
+        if kind == EVENT_REQUEST_APPROVED and player_id in self.players:
+            self.players[player_id]["approved_count"] += 1
+
+    async def get_stats_since_day(self, since_day: int) -> List[Dict[str, Any]]:
+        totals: Dict[Tuple[int, int, str], int] = {}
+        for (day, format_id, limit_id, kind), value in self.daily_stats.items():
+            if day >= since_day:
+                key = (format_id, limit_id, kind)
+                totals[key] = totals.get(key, 0) + value
+        result = []
+        for (format_id, limit_id, kind), value in sorted(totals.items()):
+            fmt = self.formats.get(format_id)
+            lim = self.limits.get(limit_id)
+            result.append(
+                {
+                    "format_id": format_id,
+                    "limit_id": limit_id,
+                    "format_name": fmt["name"] if fmt else None,
+                    "limit_name": lim["name"] if lim else None,
+                    "kind": kind,
+                    "value": value,
+                }
+            )
+        return result
+
+    # Scheduled deletions
+
+    async def schedule_deletion(self, chat_id: int, message_id: int, delete_at: int) -> None:
+        deletion_id = self._next_id("scheduled_deletions")
+        self.scheduled_deletions[deletion_id] = {
+            "id": deletion_id,
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "delete_at": delete_at,
+        }
+
+    async def get_due_scheduled_deletions(self, now_ts: int) -> List[ScheduledDeletion]:
+        return [
+            ScheduledDeletion(**d)
+            for d in self.scheduled_deletions.values()
+            if d["delete_at"] <= now_ts
+        ]
+
+    async def delete_scheduled_deletions(self, ids: List[int]) -> None:
+        for deletion_id in ids:
+            self.scheduled_deletions.pop(deletion_id, None)
+
+    # Maintenance
+
+    def _is_expired(self, table: str, row: Dict[str, Any], cutoff_ts: int) -> bool:
+        if table == "scheduled_deletions":
+            return row["delete_at"] < cutoff_ts
+        if table == "requests":
+            return (
+                row["created_at"] < cutoff_ts
+                or row["player_id"] not in self.players
+                or row["format_id"] not in self.formats
+                or row["limit_id"] not in self.limits
+            )
+        return row["created_at"] < cutoff_ts
+
+    async def purge_expired_batch(self, table: str, cutoff_ts: int, batch_size: int) -> int:
+        rows: Dict[int, Dict[str, Any]] = getattr(self, table)
+        expired = [key for key, row in rows.items() if self._is_expired(table, row, cutoff_ts)][:batch_size]
+        for key in expired:
+            del rows[key]
+        return len(expired)
+
+    async def incremental_vacuum(self, max_pages: int) -> int:
+        return 0
+
+    async def get_storage_report(self) -> Dict[str, Any]:
+        return {
+            "page_size": 0,
+            "page_count": 0,
+            "freelist_count": 0,
+            "table_bytes": {},
+        }
+
+    # Admins
+
+    async def get_admin_ids(self) -> List[int]:
+        return sorted(self.admins)
+
+    async def add_admin(self, tg_id: int, added_by: Optional[int], created_at: int) -> bool:
+        if tg_id in self.admins:
+            return False
+        self.admins[tg_id] = {"tg_id": tg_id, "added_by": added_by, "created_at": created_at}
+        return True
+
+    async def remove_admin(self, tg_id: int) -> bool:
+        return self.admins.pop(tg_id, None) is not None
+
+    # Leases
+
+    async def try_acquire_lease(self, name: str, holder: str, ttl_seconds: float, now: float) -> bool:
+        current = self.leases.get(name)
+        if current is not None and current[0] != holder and current[1] >= now:
+            return False
+        self.leases[name] = (holder, now + ttl_seconds)
+        return True
+
+    async def release_lease(self, name: str, holder: str) -> None:
+        if self.leases.get(name, ("", 0.0))[0] == holder:
+            del self.leases[name]
+
+    # Cache versions
+
+    async def bump_cache_version(self, name: str) -> None:
+        self.cache_versions[name] = self.cache_versions.get(name, 0) + 1
+
+    async def get_cache_versions(self) -> Dict[str, int]:
+        return dict(self.cache_versions)
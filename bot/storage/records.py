@@ -0,0 +1,48 @@
+from typing import NamedTuple, Optional
+
+
+# Rows as returned by every Storage backend. NamedTuples have no per-instance
+# __dict__, so large result sets and the caches stay compact; SqliteStorage
+# builds them straight from the cursor rows (field order = SELECT order).
+
+
+class Player(NamedTuple):
+    internal_id: int
+    tg_id: Optional[int]
+    username: Optional[str]
+    nick: Optional[str]
+    is_banned: int
+    created_at: Optional[int]
+    is_unreachable: int
+    approved_count: int
+
+
+class Format(NamedTuple):
+    id: int
+    name: str
+
+
+class Limit(NamedTuple):
+    id: int
+    name: str
+
+
+class Segment(NamedTuple):
+    id: int
+    format_id: int
+    limit_id: int
+
+
+class Request(NamedTuple):
+    id: int
+    player_id: int
+    format_id: int
+    limit_id: int
+    created_at: int
+
+
+class ScheduledDeletion(NamedTuple):
+    id: int
+    chat_id: int
+    message_id: int
+    delete_at: int
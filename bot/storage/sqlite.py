@@ -0,0 +1,743 @@
+import hashlib
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple, Type, TypeVar
+
+import aiosqlite
+
+from bot.storage.base import EVENT_REQUEST_APPROVED, EVENT_REQUEST_CREATED, SECONDS_PER_DAY, Storage
+from bot.storage.records import Format, Limit, Player, Request, ScheduledDeletion, Segment
+from bot.storage.writer import Statement, SqliteWriter, WriteResult
+
+
+_SCHEMA = """
+    PRAGMA foreign_keys = ON;
+
+    CREATE TABLE IF NOT EXISTS schema_meta (
+        key   TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS players (
+        internal_id   INTEGER PRIMARY KEY AUTOINCREMENT,
+        tg_id         INTEGER UNIQUE,
+        username      TEXT,
+        nick          TEXT,
+        is_banned     INTEGER DEFAULT 0,
+        created_at    INTEGER,
+        is_unreachable INTEGER DEFAULT 0,
+        approved_count INTEGER DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS game_formats (
+        id   INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE
+    );
+
+    CREATE TABLE IF NOT EXISTS limits (
+        id   INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE
+    );
+
+    CREATE TABLE IF NOT EXISTS format_limits (
+        id        INTEGER PRIMARY KEY AUTOINCREMENT,
+        format_id INTEGER NOT NULL,
+        limit_id  INTEGER NOT NULL,
+        UNIQUE (format_id, limit_id),
+        FOREIGN KEY(format_id) REFERENCES game_formats(id) ON DELETE CASCADE,
+        FOREIGN KEY(limit_id) REFERENCES limits(id) ON DELETE CASCADE
+    );
+
+    CREATE TABLE IF NOT EXISTS segments (
+        id        INTEGER PRIMARY KEY AUTOINCREMENT,
+        format_id INTEGER NOT NULL,
+        limit_id  INTEGER NOT NULL,
+        UNIQUE (format_id, limit_id),
+        FOREIGN KEY(format_id) REFERENCES game_formats(id) ON DELETE CASCADE,
+        FOREIGN KEY(limit_id) REFERENCES limits(id) ON DELETE CASCADE
+    );
+
+    CREATE TABLE IF NOT EXISTS segment_assignments (
+        player_id  INTEGER NOT NULL,
+        segment_id INTEGER NOT NULL,
+        UNIQUE (player_id, segment_id),
+        FOREIGN KEY(player_id) REFERENCES players(internal_id) ON DELETE CASCADE,
+        FOREIGN KEY(segment_id) REFERENCES segments(id) ON DELETE CASCADE
+    );
+
+    CREATE TABLE IF NOT EXISTS requests (
+        id         INTEGER PRIMARY KEY AUTOINCREMENT,
+        player_id  INTEGER NOT NULL,
+        format_id  INTEGER NOT NULL,
+        limit_id   INTEGER NOT NULL,
+        created_at INTEGER NOT NULL,
+        FOREIGN KEY(player_id) REFERENCES players(internal_id) ON DELETE CASCADE,
+        FOREIGN KEY(format_id) REFERENCES game_formats(id) ON DELETE CASCADE,
+        FOREIGN KEY(limit_id) REFERENCES limits(id) ON DELETE CASCADE
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_requests_player_pair
+        ON requests (player_id, format_id, limit_id);
+
+    CREATE INDEX IF NOT EXISTS idx_segment_assignments_segment
+        ON segment_assignments (segment_id, player_id);
+
+    CREATE TABLE IF NOT EXISTS events (
+        id         INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind       TEXT NOT NULL,
+        player_id  INTEGER,
+        format_id  INTEGER NOT NULL,
+        limit_id   INTEGER NOT NULL,
+        value      INTEGER NOT NULL DEFAULT 1,
+        created_at INTEGER NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS daily_stats (
+        day       INTEGER NOT NULL,
+        format_id INTEGER NOT NULL,
+        limit_id  INTEGER NOT NULL,
+        kind      TEXT NOT NULL,
+        value     INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, format_id, limit_id, kind)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS scheduled_deletions (
+        id         INTEGER PRIMARY KEY AUTOINCREMENT,
+        chat_id    INTEGER NOT NULL,
+        message_id INTEGER NOT NULL,
+        delete_at  INTEGER NOT NULL
+    );
+
+    -- Prefix search over nicks and usernames; external content, kept in sync by triggers
+    CREATE VIRTUAL TABLE IF NOT EXISTS players_fts USING fts5(
+        nick, username, content='players', content_rowid='internal_id'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS players_fts_insert AFTER INSERT ON players BEGIN
+        INSERT INTO players_fts (rowid, nick, username) VALUES (new.internal_id, new.nick, new.username);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS players_fts_delete AFTER DELETE ON players BEGIN
+        INSERT INTO players_fts (players_fts, rowid, nick, username)
+        VALUES ('delete', old.internal_id, old.nick, old.username);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS players_fts_update AFTER UPDATE OF nick, username ON players BEGIN
+        INSERT INTO players_fts (players_fts, rowid, nick, username)
+        VALUES ('delete', old.internal_id, old.nick, old.username);
+        INSERT INTO players_fts (rowid, nick, username) VALUES (new.internal_id, new.nick, new.username);
+    END;
+
+    CREATE TABLE IF NOT EXISTS admins (
+        tg_id      INTEGER PRIMARY KEY,
+        added_by   INTEGER,
+        created_at INTEGER NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS leases (
+        name       TEXT PRIMARY KEY,
+        holder     TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS cache_versions (
+        name    TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    );
+"""
+
+# Columns added after a table was first shipped: CREATE TABLE IF NOT EXISTS
+# leaves existing tables alone, so they are added with ALTER TABLE.
+_ADDED_COLUMNS: List[Tuple[str, str, str]] = [
+    ("players", "is_unreachable", "INTEGER DEFAULT 0"),
+    ("players", "approved_count", "INTEGER DEFAULT 0"),
+]
+
+# Run once right after the column is added, to fill it from existing data
+_COLUMN_BACKFILLS: Dict[Tuple[str, str], str] = {
+    ("players", "approved_count"): f"""
+        UPDATE players SET approved_count = (
+            SELECT COUNT(*) FROM events
+            WHERE kind = '{EVENT_REQUEST_APPROVED}' AND player_id = players.internal_id
+        )
+    """,
+}
+
+_SCHEMA_FINGERPRINT = hashlib.sha256(
+    (_SCHEMA + repr(_ADDED_COLUMNS)).encode("utf-8")
+).hexdigest()
+
+_RETENTION_FILTERS: Dict[str, str] = {
+    "scheduled_deletions": "delete_at < :cutoff",
+    "events": "created_at < :cutoff",
+    "requests": (
+        "created_at < :cutoff"
+        " OR player_id NOT IN (SELECT internal_id FROM players)"
+        " OR format_id NOT IN (SELECT id FROM game_formats)"
+        " OR limit_id NOT IN (SELECT id FROM limits)"
+    ),
+}
+
+
+_R = TypeVar("_R", bound=tuple)
+
+
+def _columns(record: Type[tuple], alias: str = "") -> str:
+    # SELECT list in the record's field order, for _record_factory
+    return ", ".join(f"{alias}{field}" for field in record._fields)
+
+
+def _record_factory(record: Type[_R]) -> Callable[[Any, tuple], _R]:
+    make = record._make
+    return lambda cursor, row: make(row)
+
+
+_PLAYER_COLUMNS = _columns(Player)
+_PLAYER_COLUMNS_P = _columns(Player, "p.")
+_REQUEST_COLUMNS = _columns(Request)
+_DELETION_COLUMNS = _columns(ScheduledDeletion)
+
+
+async def _pragma_int(db: aiosqlite.Connection, name: str) -> int:
+    async with db.execute(f"PRAGMA {name}") as cursor:
+        row = await cursor.fetchone()
+    return int(row[0]) if row else 0
+
+
+def _event_statements(
+    kind: str,
+    format_id: int,
+    limit_id: int,
+    player_id: Optional[int],
+    value: int,
+    created_at: int,
+) -> List[Statement]:
+    # Append to the event log and bump the daily rollup, in the same write operation
+    statements: List[Statement] = [
+        (
+            "INSERT INTO events (kind, player_id, format_id, limit_id, value, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, player_id, format_id, limit_id, value, created_at),
+        ),
+        (
+            """
+            INSERT INTO daily_stats (day, format_id, limit_id, kind, value)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (day, format_id, limit_id, kind) DO UPDATE SET value = value + excluded.value
+            """,
+            (created_at // SECONDS_PER_DAY, format_id, limit_id, kind, value),
+        ),
+    ]
+    if kind == EVENT_REQUEST_APPROVED and player_id is not None:
+        # Per-player approval history for the auto-approval rules
+        statements.append(
+            ("UPDATE players SET approved_count = approved_count + 1 WHERE internal_id = ?", (player_id,))
+        )
+    return statements
+
+
+class SqliteStorage(Storage):
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # All writes go through one connection and are group-committed
+        self._writer = SqliteWriter(path)
+
+    async def close(self) -> None:
+        await self._writer.close()
+
+    async def _fetchone(self, query: str, params: Sequence[Any] = ()) -> Optional[aiosqlite.Row]:
+        async with aiosqlite.connect(self.path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(query, params) as cursor:
+                return await cursor.fetchone()
+
+    async def _fetchall(self, query: str, params: Sequence[Any] = ()) -> List[aiosqlite.Row]:
+        async with aiosqlite.connect(self.path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(query, params) as cursor:
+                return await cursor.fetchall()
+
+    async def _fetch_record(self, record: Type[_R], query: str, params: Sequence[Any] = ()) -> Optional[_R]:
+        async with aiosqlite.connect(self.path) as db:
+            db.row_factory = _record_factory(record)
+            async with db.execute(query, params) as cursor:
+                return await cursor.fetchone()
+
+    async def _fetch_records(self, record: Type[_R], query: str, params: Sequence[Any] = ()) -> List[_R]:
+        # Rows become records in the cursor, with no intermediate Row or dict
+        async with aiosqlite.connect(self.path) as db:
+            db.row_factory = _record_factory(record)
+            async with db.execute(query, params) as cursor:
+                return await cursor.fetchall()
+
+    async def _write(self, query: str, params: Any = ()) -> WriteResult:
+        return await self._writer.submit([(query, params)])
+
+    async def _stored_schema_fingerprint(self, db: aiosqlite.Connection) -> Optional[str]:
+        try:
+            async with db.execute("SELECT value FROM schema_meta WHERE key = 'fingerprint'") as cursor:
+                row = await cursor.fetchone()
+        except aiosqlite.OperationalError:
+            # Database created before schema_meta existed
+            return None
+        return row[0] if row else None
+
+    async def init(self) -> bool:
+        async with aiosqlite.connect(self.path) as db:
+            if await self._stored_schema_fingerprint(db) == _SCHEMA_FINGERPRINT:
+                return False
+
+            async with db.execute("PRAGMA auto_vacuum") as cursor:
+                auto_vacuum = (await cursor.fetchone())[0]
+            if auto_vacuum != 2:
+                # Switching an existing file to incremental mode needs one full VACUUM
+                await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                await db.execute("VACUUM")
+            async with db.execute("SELECT 1 FROM sqlite_master WHERE name = 'players_fts'") as cursor:
+                has_fts = await cursor.fetchone() is not None
+            await db.executescript(_SCHEMA)
+            if not has_fts:
+                # Index players that existed before the search table
+                await db.execute("INSERT INTO players_fts (players_fts) VALUES ('rebuild')")
+            for table, column, decl in _ADDED_COLUMNS:
+                async with db.execute(f"PRAGMA table_info({table})") as cursor:
+                    columns = {row[1] for row in await cursor.fetchall()}
+                if column not in columns:
+                    await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+                    if (table, column) in _COLUMN_BACKFILLS:
+                        await db.execute(_COLUMN_BACKFILLS[(table, column)])
+            await db.execute(
+                "INSERT OR REPLACE INTO schema_meta (key, value) VALUES ('fingerprint', ?)",
+                (_SCHEMA_FINGERPRINT,),
+            )
+            await db.commit()
+        return True
+
+    # Players
+
+    async def get_player_by_tg_id(self, tg_id: int) -> Optional[Player]:
+        return await self._fetch_record(Player, f"SELECT {_PLAYER_COLUMNS} FROM players WHERE tg_id = ?", (tg_id,))
+
+    async def get_player_by_internal_id(self, internal_id: int) -> Optional[Player]:
+        return await self._fetch_record(
+            Player, f"SELECT {_PLAYER_COLUMNS} FROM players WHERE internal_id = ?", (internal_id,)
+        )
+
+    async def create_player(self, tg_id: int, username: Optional[str], created_at: int) -> Player:
+        # A concurrent update from the same user may have created the row first
+        await self._write(
+            "INSERT OR IGNORE INTO players (tg_id, username, created_at) VALUES (?, ?, ?)",
+            (tg_id, username, created_at),
+        )
+        player = await self.get_player_by_tg_id(tg_id)
+        if player is None:
+            raise RuntimeError(f"Player with tg_id={tg_id} missing right after insert")
+        return player
+
+    async def update_player_username(self, tg_id: int, username: Optional[str]) -> None:
+        await self._write("UPDATE players SET username = ? WHERE tg_id = ?", (username, tg_id))
+
+    async def set_player_nick(self, internal_id: int, nick: str) -> None:
+        await self._write("UPDATE players SET nick = ? WHERE internal_id = ?", (nick, internal_id))
+
+    async def set_player_ban(self, internal_id: int, banned: bool) -> None:
+        await self._write(
+            "UPDATE players SET is_banned = ? WHERE internal_id = ?",
+            (1 if banned else 0, internal_id),
+        )
+
+    async def set_player_unreachable(self, internal_id: int, unreachable: bool) -> None:
+        await self._write(
+            "UPDATE players SET is_unreachable = ? WHERE internal_id = ?",
+            (1 if unreachable else 0, internal_id),
+        )
+
+    async def get_banned_tg_ids(self) -> List[int]:
+        rows = await self._fetchall("SELECT tg_id FROM players WHERE is_banned = 1 AND tg_id IS NOT NULL")
+        return [int(r["tg_id"]) for r in rows]
+
+    async def search_players(self, terms: List[str], offset: int, limit: int) -> List[Player]:
+        if not terms:
+            return []
+        # Quoted so user input cannot inject FTS syntax; * makes each a prefix query
+        match = " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+        return await self._fetch_records(
+            Player,
+            f"""
+            SELECT {_PLAYER_COLUMNS_P}
+            FROM players_fts
+            JOIN players p ON p.internal_id = players_fts.rowid
+            WHERE players_fts MATCH ?
+            ORDER BY players_fts.rowid
+            LIMIT ? OFFSET ?
+            """,
+            (match, limit, offset),
+        )
+
+    async def iter_players_with_segments(self, page_size: int) -> AsyncIterator[List[Tuple[Any, ...]]]:
+        # Keyset pagination on internal_id: every page is an index range scan and
+        # the connection is released between pages
+        last_id = 0
+        while True:
+            async with aiosqlite.connect(self.path) as db:
+                async with db.execute(
+                    """
+                    SELECT p.internal_id,
+                           p.tg_id,
+                           p.username,
+                           p.nick,
+                           p.is_banned,
+                           p.created_at,
+                           (SELECT group_concat(sa.segment_id, ' ')
+                            FROM segment_assignments sa
+                            WHERE sa.player_id = p.internal_id) AS segments
+                    FROM players p
+                    WHERE p.internal_id > ?
+                    ORDER BY p.internal_id
+                    LIMIT ?
+                    """,
+                    (last_id, page_size),
+                ) as cursor:
+                    page = await cursor.fetchall()
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            last_id = page[-1][0]
+
+    # Catalog
+
+    async def add_format(self, name: str) -> int:
+        result = await self._write("INSERT OR IGNORE INTO game_formats (name) VALUES (?)", (name,))
+        if result.lastrowid:
+            return result.lastrowid
+        row = await self._fetchone("SELECT id FROM game_formats WHERE name = ?", (name,))
+        return int(row["id"]) if row else 0
+
+    async def add_limit(self, name: str) -> int:
+        result = await self._write("INSERT OR IGNORE INTO limits (name) VALUES (?)", (name,))
+        if result.lastrowid:
+            return result.lastrowid
+        row = await self._fetchone("SELECT id FROM limits WHERE name = ?", (name,))
+        return int(row["id"]) if row else 0
+
+    async def link_format_limit(self, format_id: int, limit_id: int) -> None:
+        await self._write(
+            "INSERT OR IGNORE INTO format_limits (format_id, limit_id) VALUES (?, ?)",
+            (format_id, limit_id),
+        )
+
+    async def get_formats(self) -> List[Format]:
+        return await self._fetch_records(Format, "SELECT id, name FROM game_formats ORDER BY id")
+
+    async def get_limits(self) -> List[Limit]:
+        return await self._fetch_records(Limit, "SELECT id, name FROM limits ORDER BY id")
+
+    async def get_format_limit_links(self) -> List[Tuple[int, int]]:
+        rows = await self._fetchall("SELECT format_id, limit_id FROM format_limits ORDER BY limit_id")
+        return [(int(r["format_id"]), int(r["limit_id"])) for r in rows]
+
+    # Segments
+
+    async def get_or_create_segment(self, format_id: int, limit_id: int) -> int:
+        row = await self._fetchone(
+            "SELECT id FROM segments WHERE format_id = ? AND limit_id = ?",
+            (format_id, limit_id),
+        )
+        if row:
+            return int(row["id"])
+
+        result = await self._write(
+            "INSERT INTO segments (format_id, limit_id) VALUES (?, ?)",
+            (format_id, limit_id),
+        )
+        return result.lastrowid
+
+    async def get_segment_by_pair(self, format_id: int, limit_id: int) -> Optional[Segment]:
+        return await self._fetch_record(
+            Segment,
+            "SELECT id, format_id, limit_id FROM segments WHERE format_id = ? AND limit_id = ?",
+            (format_id, limit_id),
+        )
+
+    async def assign_segment(self, player_id: int, segment_id: int) -> None:
+        await self._write(
+            "INSERT OR IGNORE INTO segment_assignments (player_id, segment_id) VALUES (?, ?)",
+            (player_id, segment_id),
+        )
+
+    async def unassign_segment(self, player_id: int, segment_id: int) -> None:
+        await self._write(
+            "DELETE FROM segment_assignments WHERE player_id = ? AND segment_id = ?",
+            (player_id, segment_id),
+        )
+
+    async def get_segments_for_player(self, player_id: int) -> List[int]:
+        rows = await self._fetchall(
+            "SELECT segment_id FROM segment_assignments WHERE player_id = ? ORDER BY segment_id",
+            (player_id,),
+        )
+        return [int(r["segment_id"]) for r in rows]
+
+    async def get_segments_with_names(self, offset: int, limit: int) -> List[Dict[str, Any]]:
+        rows = await self._fetchall(
+            """
+            SELECT s.id AS segment_id,
+                   s.format_id,
+                   s.limit_id,
+                   gf.name AS format_name,
+                   l.name  AS limit_name
+            FROM segments s
+            JOIN game_formats gf ON gf.id = s.format_id
+            JOIN limits l ON l.id = s.limit_id
+            ORDER BY s.id
+            LIMIT ? OFFSET ?
+            """,
+            (limit, offset),
+        )
+        return [dict(r) for r in rows]
+
+    async def count_segments(self) -> int:
+        row = await self._fetchone(
+            """
+            SELECT COUNT(*)
+            FROM segments s
+            JOIN game_formats gf ON gf.id = s.format_id
+            JOIN limits l ON l.id = s.limit_id
+            """
+        )
+        return int(row[0]) if row else 0
+
+    async def iter_segment_audience(self, segment_id: int, page_size: int) -> AsyncIterator[List[int]]:
+        # Keyset pagination on player_id over idx_segment_assignments_segment: a
+        # broadcast consumes pages for minutes, so no read transaction (and WAL
+        # snapshot) is held open between pages
+        last_id = 0
+        while True:
+            rows = await self._fetchall(
+                """
+                SELECT sa.player_id, p.tg_id
+                FROM segment_assignments sa
+                JOIN players p ON p.internal_id = sa.player_id
+                WHERE sa.segment_id = ?
+                  AND sa.player_id > ?
+                  AND p.is_banned = 0
+                  AND p.is_unreachable = 0
+                  AND p.tg_id IS NOT NULL
+                ORDER BY sa.player_id
+                LIMIT ?
+                """,
+                (segment_id, last_id, page_size),
+            )
+            if not rows:
+                return
+            yield [int(r["tg_id"]) for r in rows]
+            if len(rows) < page_size:
+                return
+            last_id = int(rows[-1]["player_id"])
+
+    async def count_segment_audience(self, segment_id: int, exclude_tg_id: Optional[int] = None) -> int:
+        row = await self._fetchone(
+            """
+            SELECT COUNT(*) AS n
+            FROM segment_assignments sa
+            JOIN players p ON p.internal_id = sa.player_id
+            WHERE sa.segment_id = ?
+              AND p.is_banned = 0
+              AND p.is_unreachable = 0
+              AND p.tg_id IS NOT NULL
+              AND p.tg_id IS NOT ?
+            """,
+            (segment_id, exclude_tg_id),
+        )
+        return int(row["n"]) if row else 0
+
+    async def get_segment_assignments(self) -> List[Tuple[int, Optional[int], bool, bool, int]]:
+        rows = await self._fetchall(
+            """
+            SELECT sa.player_id, p.tg_id, p.is_banned, p.is_unreachable, sa.segment_id
+            FROM segment_assignments sa
+            JOIN players p ON p.internal_id = sa.player_id
+            """
+        )
+        return [
+            (
+                int(r["player_id"]),
+                r["tg_id"],
+                bool(r["is_banned"]),
+                bool(r["is_unreachable"]),
+                int(r["segment_id"]),
+            )
+            for r in rows
+        ]
+
+    # Requests
+
+    async def create_request(self, player_id: int, format_id: int, limit_id: int, created_at: int) -> int:
+        result = await self._writer.submit(
+            [
+                (
+                    "INSERT INTO requests (player_id, format_id, limit_id, created_at) VALUES (?, ?, ?, ?)",
+                    (player_id, format_id, limit_id, created_at),
+                ),
+                *_event_statements(EVENT_REQUEST_CREATED, format_id, limit_id, player_id, 1, created_at),
+            ]
+        )
+        return result.lastrowid
+
+    async def get_request_by_id(self, request_id: int) -> Optional[Request]:
+        return await self._fetch_record(
+            Request, f"SELECT {_REQUEST_COLUMNS} FROM requests WHERE id = ?", (request_id,)
+        )
+
+    async def get_pending_request(
+        self, player_id: int, format_id: int, limit_id: int
+    ) -> Optional[Request]:
+        return await self._fetch_record(
+            Request,
+            f"SELECT {_REQUEST_COLUMNS} FROM requests WHERE player_id = ? AND format_id = ? AND limit_id = ? LIMIT 1",
+            (player_id, format_id, limit_id),
+        )
+
+    async def delete_request(self, request_id: int) -> None:
+        await self._write("DELETE FROM requests WHERE id = ?", (request_id,))
+
+    # Statistics
+
+    async def record_event(
+        self,
+        kind: str,
+        format_id: int,
+        limit_id: int,
+        player_id: Optional[int],
+        value: int,
+        created_at: int,
+    ) -> None:
+        await self._writer.submit(_event_statements(kind, format_id, limit_id, player_id, value, created_at))
+
+    async def get_stats_since_day(self, since_day: int) -> List[Dict[str, Any]]:
+        rows = await self._fetchall(
+            """
+            SELECT ds.format_id,
+                   ds.limit_id,
+                   gf.name AS format_name,
+                   l.name  AS limit_name,
+                   ds.kind,
+                   SUM(ds.value) AS value
+            FROM daily_stats ds
+            LEFT JOIN game_formats gf ON gf.id = ds.format_id
+            LEFT JOIN limits l ON l.id = ds.limit_id
+            WHERE ds.day >= ?
+            GROUP BY ds.format_id, ds.limit_id, ds.kind
+            ORDER BY ds.format_id, ds.limit_id
+            """,
+            (since_day,),
+        )
+        return [dict(r) for r in rows]
+
+    # Scheduled deletions
+
+    async def schedule_deletion(self, chat_id: int, message_id: int, delete_at: int) -> None:
+        await self._write(
+            "INSERT INTO scheduled_deletions (chat_id, message_id, delete_at) VALUES (?, ?, ?)",
+            (chat_id, message_id, delete_at),
+        )
+
+    async def get_due_scheduled_deletions(self, now_ts: int) -> List[ScheduledDeletion]:
+        return await self._fetch_records(
+            ScheduledDeletion,
+            f"SELECT {_DELETION_COLUMNS} FROM scheduled_deletions WHERE delete_at <= ?",
+            (now_ts,),
+        )
+
+    async def delete_scheduled_deletions(self, ids: List[int]) -> None:
+        if not ids:
+            return
+        placeholders = ",".join("?" for _ in ids)
+        query = f"DELETE FROM scheduled_deletions WHERE id IN ({placeholders})"
+        await self._write(query, list(ids))
+
+    # Maintenance
+
+    async def purge_expired_batch(self, table: str, cutoff_ts: int, batch_size: int) -> int:
+        where = _RETENTION_FILTERS[table]
+        query = (
+            f"DELETE FROM {table} WHERE rowid IN "
+            f"(SELECT rowid FROM {table} WHERE {where} LIMIT :batch_size)"
+        )
+        result = await self._write(query, {"cutoff": cutoff_ts, "batch_size": batch_size})
+        return result.rowcount
+
+    async def incremental_vacuum(self, max_pages: int) -> int:
+        async with aiosqlite.connect(self.path) as db:
+            before = await _pragma_int(db, "freelist_count")
+            # A plain execute only runs the pragma's first step (one page);
+            # executescript steps it to completion
+            await db.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+            after = await _pragma_int(db, "freelist_count")
+        return before - after
+
+    async def get_storage_report(self) -> Dict[str, Any]:
+        async with aiosqlite.connect(self.path) as db:
+            report: Dict[str, Any] = {
+                "page_size": await _pragma_int(db, "page_size"),
+                "page_count": await _pragma_int(db, "page_count"),
+                "freelist_count": await _pragma_int(db, "freelist_count"),
+            }
+            try:
+                async with db.execute(
+                    "SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY 2 DESC"
+                ) as cursor:
+                    report["table_bytes"] = {name: int(size) for name, size in await cursor.fetchall()}
+            except aiosqlite.OperationalError:
+                # SQLite built without the dbstat virtual table
+                report["table_bytes"] = {}
+        return report
+
+    # Admins
+
+    async def get_admin_ids(self) -> List[int]:
+        rows = await self._fetchall("SELECT tg_id FROM admins ORDER BY tg_id")
+        return [int(r["tg_id"]) for r in rows]
+
+    async def add_admin(self, tg_id: int, added_by: Optional[int], created_at: int) -> bool:
+        result = await self._write(
+            "INSERT OR IGNORE INTO admins (tg_id, added_by, created_at) VALUES (?, ?, ?)",
+            (tg_id, added_by, created_at),
+        )
+        return result.rowcount > 0
+
+    async def remove_admin(self, tg_id: int) -> bool:
+        result = await self._write("DELETE FROM admins WHERE tg_id = ?", (tg_id,))
+        return result.rowcount > 0
+
+    # Leases
+
+    async def try_acquire_lease(self, name: str, holder: str, ttl_seconds: float, now: float) -> bool:
+        # Take a free or expired lease, or extend our own; the single
+        # statement makes the check-and-set atomic across processes
+        result = await self._write(
+            """
+            INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+            WHERE leases.holder = excluded.holder OR leases.expires_at < ?
+            """,
+            (name, holder, now + ttl_seconds, now),
+        )
+        return result.rowcount > 0
+
+    async def release_lease(self, name: str, holder: str) -> None:
+        await self._write("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+
+    # Cache versions
+
+    async def bump_cache_version(self, name: str) -> None:
+        await self._write(
+            """
+            INSERT INTO cache_versions (name, version) VALUES (?, 1)
+            ON CONFLICT (name) DO UPDATE SET version = version + 1
+            """,
+            (name,),
+        )
+
+    async def get_cache_versions(self) -> Dict[str, int]:
+        rows = await self._fetchall("SELECT name, version FROM cache_versions")
+        return {r["name"]: int(r["version"]) for r in rows}
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from typing import Any, List, Optional, Sequence, Tuple
+
+import aiosqlite
+
+
+logger = logging.getLogger(__name__)
+
+# Writes arriving within this window after the first one share a transaction
+DEFAULT_BATCH_WINDOW_SECONDS = 0.002
+DEFAULT_BATCH_MAX = 256
+
+Statement = Tuple[str, Any]
+
+
+class WriteResult:
+    __slots__ = ("lastrowid", "rowcount")
+
+    def __init__(self, lastrowid: Optional[int], rowcount: int) -> None:
+        self.lastrowid = lastrowid
+        self.rowcount = rowcount
+
+
+class _WriteOp:
+    __slots__ = ("statements", "future")
+
+    def __init__(self, statements: Sequence[Statement], future: "asyncio.Future[WriteResult]") -> None:
+        self.statements = statements
+        self.future = future
+
+
+class SqliteWriter:
+    """Single connection that performs every write, with group commit.
+
+    Operations queued within ``batch_window`` seconds of each other are run in
+    one transaction (one fsync). Each operation gets its own savepoint, so a
+    failing one is rolled back alone and the rest of the batch still commits.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_window: float = DEFAULT_BATCH_WINDOW_SECONDS,
+        batch_max: int = DEFAULT_BATCH_MAX,
+    ) -> None:
+        self.path = path
+        self.batch_window = batch_window
+        self.batch_max = batch_max
+        self._queue: Optional["asyncio.Queue[Optional[_WriteOp]]"] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches_total = 0
+        self.ops_total = 0
+
+    async def submit(self, statements: Sequence[Statement]) -> WriteResult:
+        """Run the statements atomically; returns lastrowid/rowcount of the first one.
+
+        lastrowid is None if the first statement inserted nothing (e.g. INSERT OR IGNORE).
+        """
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        future: "asyncio.Future[WriteResult]" = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_WriteOp(statements, future))
+        return await future
+
+    async def close(self) -> None:
+        """Finish the queued writes and close the connection."""
+        if self._task is None or self._task.done():
+            return
+        self._queue.put_nowait(None)
+        await self._task
+
+    async def _collect(self, first: _WriteOp) -> Tuple[List[_WriteOp], bool]:
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_window
+        while len(batch) < self.batch_max:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                op = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if op is None:
+                return batch, True
+            batch.append(op)
+        return batch, False
+
+    async def _run(self) -> None:
+        try:
+            # Autocommit mode: transactions are managed explicitly below
+            async with aiosqlite.connect(self.path, isolation_level=None) as db:
+                while True:
+                    first = await self._queue.get()
+                    if first is None:
+                        return
+                    batch, closing = await self._collect(first)
+                    await self._commit_batch(db, batch)
+                    if closing:
+                        return
+        except Exception as e:  # noqa: BLE001
+            # The next submit() starts a new writer; fail whoever is waiting now
+            logger.exception("Database writer stopped: %s", e)
+            while not self._queue.empty():
+                op = self._queue.get_nowait()
+                if op is not None and not op.future.done():
+                    op.future.set_exception(e)
+
+    async def _commit_batch(self, db: aiosqlite.Connection, batch: List[_WriteOp]) -> None:
+        results: List[Tuple[_WriteOp, WriteResult]] = []
+        try:
+            await db.execute("BEGIN IMMEDIATE")
+        except Exception as e:  # noqa: BLE001
+            # Typically "database is locked" by another process past the busy timeout
+            for op in batch:
+                if not op.future.done():
+                    op.future.set_exception(e)
+            return
+        try:
+            for op in batch:
+                await db.execute("SAVEPOINT op")
+                try:
+                    result = None
+                    for sql, params in op.statements:
+                        cursor = await db.execute(sql, params)
+                        if result is None:
+                            lastrowid = cursor.lastrowid if cursor.rowcount > 0 else None
+                            result = WriteResult(lastrowid, cursor.rowcount)
+                    await db.execute("RELEASE op")
+                    results.append((op, result))
+                except Exception as e:  # noqa: BLE001
+                    await db.execute("ROLLBACK TO op")
+                    await db.execute("RELEASE op")
+                    if not op.future.done():
+                        op.future.set_exception(e)
+            await db.execute("COMMIT")
+        except Exception as e:  # noqa: BLE001
+            logger.exception("Write batch of %d operation(s) failed: %s", len(batch), e)
+            try:
+                await db.execute("ROLLBACK")
+            except Exception:  # noqa: BLE001
+                pass
+            for op in batch:
+                if not op.future.done():
+                    op.future.set_exception(e)
+            return
+
+        self.batches_total += 1
+        self.ops_total += len(batch)
+        for op, result in results:
+            if not op.future.done():
+                op.future.set_result(result)
@@ -5,6 +5,10 @@ def html_safe(text: str) -> str:
     return html_escape(text or "")
 
 
+# Telegram rejects longer messages
+MESSAGE_MAX_LENGTH = 4096
+
+
 ASK_NICK = "Привет! Отправь, пожалуйста, свой ник в Pokerbros."
 
 ALREADY_REGISTERED = "Снова привет! Твой ник в Pokerbros уже сохранён."
@@ -34,6 +38,14 @@ NO_LIMITS_TEXT = (
 
 HELP_TEXT = "Напишите администратору: @Bravo_Poker"
 
+REQUEST_SENT_TEXT = "Ваша заявка отправлена на модерацию."
+
+REQUEST_AUTO_APPROVED_TEXT = "Ваша заявка одобрена, игроки получат приглашение."
+
+REQUEST_ALREADY_PENDING_TEXT = "Такая заявка уже ждёт модерации."
+
+REQUEST_RATE_LIMITED_TEXT = "Слишком много заявок. Попробуйте чуть позже."
+
 REQUEST_TO_ADMIN_TEMPLATE = (
     "Игрок <b>{nick}</b> хочет собрать игру\n"
     "Формат: <b>{format}</b>\n"
@@ -41,6 +53,14 @@ REQUEST_TO_ADMIN_TEMPLATE = (
     "Ссылка на игрока: {link}"
 )
 
+REQUEST_AUTO_APPROVED_TO_ADMIN_TEMPLATE = (
+    "Заявка одобрена автоматически\n"
+    "Игрок <b>{nick}</b> собирает игру\n"
+    "Формат: <b>{format}</b>\n"
+    "Лимит: <b>{limit}</b>\n"
+    "Ссылка на игрока: {link}"
+)
+
 BROADCAST_TEMPLATE = (
     "Игрок '{nick}' ждет тебя на Pokerbros\n\n"
     "'{nick}' ждет тебя за столом '{format}' + '{limit}'\n\n"
@@ -48,6 +68,32 @@ BROADCAST_TEMPLATE = (
     "Если нужно сделать депозит пиши СЮДА ({deposit_link})"
 )
 
+BROADCAST_DIGEST_HEADER = "Игроки ждут тебя на Pokerbros"
+
+BROADCAST_DIGEST_ITEM_TEMPLATE = "'{nick}' ждет тебя за столом '{format}' + '{limit}'"
+
+BROADCAST_DIGEST_MORE_TEMPLATE = "…и ещё {count} игрок(ов)"
+
+BROADCAST_DIGEST_FOOTER = (
+    "Если хочешь присоединиться открывай приложение Pokerbros и заходи в Bravo Poker\n\n"
+    "Если нужно сделать депозит пиши СЮДА ({deposit_link})"
+)
+
+BROADCAST_PROGRESS_TEMPLATE = (
+    "Рассылка: отправлено {sent} из {total}, ошибок {failed}, "
+    "ждут повтора {queued}, осталось {remaining}.\n"
+    "Примерно до конца: {eta}"
+)
+
+BROADCAST_DONE_TEMPLATE = (
+    "Рассылка завершена: отправлено {sent} из {total}, ошибок {failed}, ждут повтора {queued}."
+)
+
+BROADCAST_CANCELLED_TEMPLATE = (
+    "Рассылка остановлена: отправлено {sent} из {total}, ошибок {failed}, "
+    "не отправлено {remaining}."
+)
+
 REJECT_PLAYER_TEXT = (
     "К сожалению, ваше предложение не отправлено, для уточнения причины напишите "
     "менеджеру @Bravo_Poker"
@@ -85,9 +131,79 @@ SEGMENT_ITEM_TEMPLATE = (
     "#{segment_id}: формат '{format_name}' (id={format_id}), лимит '{limit_name}' (id={limit_id})"
 )
 
+STATS_HEADER_TEMPLATE = (
+    "Статистика за {days} дн.:\n"
+    "Заявок: {created}, одобрено: {approved}, отклонено: {rejected} "
+    "(одобрение {approval_rate}%)\n"
+    "Охват рассылок: доставлено {sent}, ошибок {failed}"
+)
+
+STATS_ITEM_TEMPLATE = (
+    "'{format_name}' + '{limit_name}': заявок {created}, одобрено {approved}, "
+    "отклонено {rejected}, доставлено {sent}"
+)
+
+STATS_EMPTY_TEXT = "За этот период событий нет."
+
+EXPORT_STARTED_TEXT = "Готовлю выгрузку игроков..."
+
+EXPORT_DONE_TEXT = "Выгрузка игроков: {count} шт."
+
+EXPORT_FAILED_TEXT = "Не удалось подготовить выгрузку."
+
+BACKGROUND_TASK_FAILED_TEXT = "Не удалось выполнить действие. Попробуйте ещё раз позже."
+
+BACKGROUND_BUSY_TEXT = "Бот сейчас перегружен, попробуйте через минуту."
+
+FIND_HEADER_TEMPLATE = "Игроки по запросу «{query}», стр. {page}:"
+
+FIND_ITEM_TEMPLATE = "#{internal_id} | tg_id {tg_id} | @{username} | {nick}"
+
+FIND_EMPTY_TEXT = "Никого не найдено."
+
+LOAD_ITEM_TEMPLATE = (
+    "{name}: {in_flight}/{limit} в работе, в очереди {queue_depth} (макс. {max_queue_depth}), "
+    "принято {admitted_total}, отброшено {shed_total}, "
+    "ожидание p50 {wait_p50_ms:.0f} мс, p95 {wait_p95_ms:.0f} мс, макс. {wait_max_ms:.0f} мс"
+)
+
+LOAD_FLOOD_TEMPLATE = (
+    "антифлуд: пропущено {passed_total}, отброшено {throttled_total}, "
+    "отслеживается пользователей {tracked_users}"
+)
+
+LAG_TEMPLATE = (
+    "Задержка event loop ({samples} замеров): p50 {p50_ms:.1f} мс, p95 {p95_ms:.1f} мс, "
+    "p99 {p99_ms:.1f} мс, макс. {max_ms:.1f} мс. Зависаний записано: {stalls}"
+)
+
+LAG_STALL_TEMPLATE = "{at}: ~{lag_ms:.0f} мс\n<pre>{stack}</pre>"
+
+MEMSTATS_TEMPLATE = (
+    "RSS: {rss_mb:.1f} МБ{rss_note}\n"
+    "FSM: {fsm_size}\n\n"
+    "Кэши и очереди:\n{caches}\n\n"
+    "Объекты по типам:\n{types}"
+)
+
+MEMSTATS_TRACE_TEMPLATE = "Трассировка tracemalloc: {state}"
+
+MEMSTATS_TOP_HEADER = "Топ мест выделения памяти:"
+
+MEMSTATS_DIFF_HEADER = "Изменения с прошлого вызова:"
+
+MEMSTATS_TRACE_HINT = "Места выделения памяти: включите трассировку командой /memstats on"
+
 BAN_OK = "Игрок заблокирован."
 UNBAN_OK = "Игрок разблокирован."
 SETNICK_OK = "Ник игрока обновлён."
 
+ADMIN_ADDED_TEXT = "Администратор добавлен."
+ADMIN_ALREADY_TEXT = "Этот пользователь уже администратор."
+ADMIN_REMOVED_TEXT = "Администратор удалён."
+ADMIN_NOT_FOUND_TEXT = "Этот пользователь не администратор."
+ADMIN_SELF_REMOVE_TEXT = "Нельзя удалить самого себя."
+ADMINS_LIST_HEADER = "Администраторы (tg_id):"
+
 PARSING_ERROR = "Некорректный формат команды."
 